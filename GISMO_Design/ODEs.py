@@ -23,4 +23,17 @@ def descent(y, t, rho, mass_payload, drag_coefficient, area, thrust):
     dvdt = net_force / mass_payload
     # Derivative of height is the velocity
     dhdt = -v  # Negative because as the object falls, height decreases
-    return [dvdt, dhdt]
\ No newline at end of file
+    return [dvdt, dhdt]
+
+def drift_descent(y, t, rho, mass_payload, drag_coefficient, area, thrust, wind):
+    # Descent with horizontal motion: y = [east, north, h, u_east, u_north, v], v positive downwards.
+    # wind(h) gives the horizontal wind (east, north) at height h. Drag acts on the
+    # airspeed (velocity relative to the wind). Works on arrays of samples as well.
+    east, north, h, u_east, u_north, v = y
+    wind_east, wind_north = wind(h)
+    air_east = u_east - wind_east
+    air_north = u_north - wind_north
+    airspeed = (air_east ** 2 + air_north ** 2 + v ** 2) ** 0.5
+    drag = 0.5 * rho * airspeed * drag_coefficient * area / mass_payload # Drag acceleration per unit airspeed
+    dvdt = g - thrust / mass_payload - drag * v
+    return [u_east, u_north, -v, -drag * air_east, -drag * air_north, dvdt]
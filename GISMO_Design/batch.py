@@ -0,0 +1,129 @@
+'''
+Command line batch runner for many payload configurations.
+
+Each scenario file (JSON, TOML or YAML) holds any of the USER SETTINGS fields from
+main.py, e.g.
+
+    {"deployment_height_ft": 450, "mass_payload_lb": 6.61, "drag_coefficient": 0.3}
+
+Missing fields fall back to the main.py defaults. Every scenario is optimized on a
+worker pool, its result is saved as <output>/<scenario name>.json and all results are
+collected into <output>/results.csv. Scenarios that already have a result file from
+the same mode (coupled or --decomposed) are skipped unless --force is given.
+
+Usage:
+    python batch.py scenarios/*.json -o results --workers 8 --figures
+'''
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cache
+import design
+
+RESULT_FIELDS = ['mode', 'k', 'c', 'thrust', 'impact_velocity_fts', 'max_g_force', 'total_displacement_in', 'objective', 'success', 'nfev']
+
+
+def load_scenario(path):
+    '''Read a scenario file into a settings dictionary based on its extension.'''
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        with open(path) as f:
+            return json.load(f)
+    if ext == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required to read YAML scenario files (pip install pyyaml)")
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"Unsupported scenario file type: {path}")
+
+
+def scenario_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def run_scenario(path, output_dir, figures=None, decomposed=False):
+    '''Optimize one scenario file and write its result JSON (and figure). Runs in a worker.'''
+    settings = design.make_settings(load_scenario(path))
+    result = design.optimize_decomposed(settings) if decomposed else design.optimize(settings)
+    result['scenario'] = scenario_name(path)
+    result['mode'] = 'decomposed' if decomposed else 'coupled'
+    with open(os.path.join(output_dir, result['scenario'] + '.json'), 'w') as f:
+        json.dump(result, f, indent=2)
+    if figures:
+        import report
+        report.design_figure(settings, result, os.path.join(output_dir, result['scenario'] + '.' + figures))
+    return result
+
+
+def write_table(results, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['scenario'] + RESULT_FIELDS)
+        writer.writeheader()
+        for result in sorted(results, key=lambda r: r['scenario']):
+            writer.writerow({key: result[key] for key in ['scenario'] + RESULT_FIELDS})
+
+
+def run_batch(paths, output_dir, workers=None, figures=None, force=False, decomposed=False):
+    '''Run every scenario not already done, then write results.csv with all results.'''
+    os.makedirs(output_dir, exist_ok=True)
+    names = [scenario_name(p) for p in paths]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"Scenario names must be unique: {', '.join(sorted(duplicates))}")
+
+    mode = 'decomposed' if decomposed else 'coupled'
+    results = []
+    todo = []
+    for path in paths:
+        result_path = os.path.join(output_dir, scenario_name(path) + '.json')
+        if os.path.exists(result_path) and not force:
+            with open(result_path) as f:
+                result = json.load(f)
+            # Results written before the mode was recorded are coupled ones
+            if result.setdefault('mode', 'coupled') == mode:
+                results.append(result)
+                print(f"Skipping {path} (result exists)")
+                continue
+        todo.append(path)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_scenario, path, output_dir, figures, decomposed): path for path in todo}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Failed {futures[future]}: {e}")
+                continue
+            results.append(result)
+            print(f"Done {futures[future]}: k={result['k']:.2f} N/m, c={result['c']:.2f} Ns/m, thrust={result['thrust']:.2f} N")
+
+    write_table(results, os.path.join(output_dir, 'results.csv'))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimize many payload scenario files in parallel.")
+    parser.add_argument('scenarios', nargs='+', help="Scenario files (.json, .toml, .yaml)")
+    parser.add_argument('-o', '--output', default='results', help="Output directory (default: results)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--figures', nargs='?', const='png', choices=['png', 'svg', 'pdf'], help="Also save a figure for each scenario (default format: png)")
+    parser.add_argument('--decomposed', action='store_true', help="Use the full thrust budget and optimize only k and c (design.optimize_decomposed)")
+    parser.add_argument('--cache', metavar='PATH', help="Reuse simulation/optimization results stored in this cache file")
+    parser.add_argument('--force', action='store_true', help="Re-run scenarios that already have results")
+    args = parser.parse_args(argv)
+    if args.cache:
+        cache.enable(args.cache)
+    run_batch(args.scenarios, args.output, workers=args.workers, figures=args.figures, force=args.force, decomposed=args.decomposed)
+
+
+if __name__ == '__main__':
+    main()
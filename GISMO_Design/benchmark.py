@@ -0,0 +1,236 @@
+'''
+Accuracy versus cost benchmark of the integrators used in this project.
+
+Compares, on the impact velocity of the descent and the peak g of the SMD:
+ - euler:     the explicit Euler loops of the old/ scripts, over time steps
+ - odeint:    func_def.simulate_* as main.py uses them (argmin of |height| and
+              np.gradient acceleration), over the number of sample points
+ - solve_ivp: adaptive RK45 with a ground event (descent) and a jerk event (SMD peak),
+              over tolerances
+ - exact:     the closed-form solutions (tradecurves, trajectory)
+
+Errors are relative to the closed-form solutions. Each method/setting is run on soft
+and stiff SMD designs and on unpowered and powered descents; the report lists error and
+wall time, draws work-precision curves and recommends the cheapest setting of every
+method that meets the tolerance on all cases.
+
+Usage:
+    python benchmark.py --tolerance 1e-3 --output benchmark.png
+'''
+import argparse
+import time
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+import design
+import func_def
+import tradecurves
+from trajectory import SMDTrajectory
+
+# Representative cases (SI units)
+SMD_CASES = {
+    'soft': {'m': 0.2, 'c': 3.0, 'k': 50.4, 'v0': 4.8}, # old/measurements.py
+    'main.py optimum': {'m': 0.2268, 'c': 5.55, 'k': 153.9, 'v0': 16.1},
+    'stiff': {'m': 0.2268, 'c': 20.0, 'k': 5000.0, 'v0': 16.1},
+}
+DESCENT_CASES = {
+    'unpowered': {'v0': 3.9624, 'h0': 137.16, 'm': 2.998, 'cd': 0.3, 'area': 0.01085, 'thrust': 0.0},
+    'powered': {'v0': 3.9624, 'h0': 137.16, 'm': 2.998, 'cd': 0.3, 'area': 0.01085, 'thrust': 26.46},
+}
+SMD_DURATION = 1.0 # s, as in main.py
+DESCENT_DURATION = 40.0 # s, as in main.py
+
+SETTINGS = {
+    'euler': [1e-2, 3e-3, 1e-3, 3e-4, 1e-4, 3e-5], # dt (s)
+    'odeint': [100, 300, 1000, 3000, 10000, 30000], # Sample points
+    'solve_ivp': [1e-3, 1e-4, 1e-5, 1e-6, 1e-8, 1e-10], # rtol
+    'exact': [None],
+}
+
+
+# ---- Methods: each returns the impact velocity or the peak g ----
+
+def euler_descent(case, dt):
+    # Same loop as old/impactvelocity.py and old/descentModel.py
+    velocity, height = case['v0'], case['h0']
+    m, T = case['m'], case['thrust']
+    drag = 0.5 * case['cd'] * design.rho * case['area']
+    while height > 0:
+        acceleration = (m * design.g - drag * velocity ** 2 - T) / m
+        velocity += acceleration * dt
+        height -= velocity * dt
+        if velocity <= 0:
+            return np.nan # Stopped above the ground
+    return velocity
+
+
+def euler_smd(case, dt):
+    # Same loop as old/systemDesign.py
+    m, c, k = case['m'], case['c'], case['k']
+    position, velocity, peak = 0.0, case['v0'], 0.0
+    for _ in range(int(round(SMD_DURATION / dt))):
+        acceleration = (-c * velocity - k * position) / m
+        peak = max(peak, abs(acceleration))
+        velocity += acceleration * dt
+        position += velocity * dt
+    return peak / design.g
+
+
+def odeint_descent(case, points):
+    t = np.linspace(0, DESCENT_DURATION, points)
+    height, velocity, _ = func_def.simulate_descent.__wrapped__(case['v0'], case['h0'], design.rho, case['m'], case['cd'], case['area'], case['thrust'], t)
+    return velocity[(np.abs(height)).argmin()]
+
+
+def odeint_smd(case, points):
+    t = np.linspace(0, SMD_DURATION, points)
+    _, _, acceleration = func_def.simulate_smd.__wrapped__(0, case['v0'], case['m'], case['c'], case['k'], t)
+    return np.max(np.abs(acceleration)) / design.g
+
+
+def solve_ivp_descent(case, rtol):
+    a_drag = 0.5 * design.rho * case['cd'] * case['area'] / case['m']
+    a = design.g - case['thrust'] / case['m']
+
+    def ground(t, y):
+        return y[1]
+    ground.terminal = True
+    result = solve_ivp(lambda t, y: [a - a_drag * abs(y[0]) * y[0], -y[0]], (0, DESCENT_DURATION), [case['v0'], case['h0']], events=ground, rtol=rtol, atol=rtol * 1e-2)
+    return result.y_events[0][0][0] if len(result.t_events[0]) else np.nan
+
+
+def solve_ivp_smd(case, rtol):
+    m, c, k = case['m'], case['c'], case['k']
+
+    def rhs(t, y):
+        return [y[1], (-k * y[0] - c * y[1]) / m]
+
+    def jerk(t, y):
+        # Zero where the acceleration has an extremum
+        return (-k * y[1] - c * (-k * y[0] - c * y[1]) / m) / m
+    result = solve_ivp(rhs, (0, SMD_DURATION), [0, case['v0']], events=jerk, rtol=rtol, atol=rtol * 1e-3)
+    states = np.vstack([result.y[:, :1].T, result.y_events[0], result.y[:, -1:].T])
+    return np.max(np.abs((-k * states[:, 0] - c * states[:, 1]) / m)) / design.g
+
+
+def exact_descent(case, _):
+    return float(tradecurves.impact_state(case['cd'], case['m'], case['area'], case['h0'], case['v0'], case['thrust'])['impact_velocity'])
+
+
+def exact_smd(case, _):
+    return abs(SMDTrajectory(0, case['v0'], case['m'], case['c'], case['k']).peak_acceleration(SMD_DURATION)[1]) / design.g
+
+
+METHODS = {
+    'euler': (euler_descent, euler_smd),
+    'odeint': (odeint_descent, odeint_smd),
+    'solve_ivp': (solve_ivp_descent, solve_ivp_smd),
+    'exact': (exact_descent, exact_smd),
+}
+
+
+def _timed(func, *args, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return value, best
+
+
+def run_benchmark(methods=None, repeat=3):
+    '''
+    Run every method/setting on every case.
+
+    Returns a list of records: method, setting, case, quantity ('impact_velocity'
+    or 'peak_g'), value, reference, relative error and wall time (s).
+    '''
+    records = []
+    for method in methods or METHODS:
+        descent_func, smd_func = METHODS[method]
+        for setting in SETTINGS[method]:
+            for quantity, func, cases, exact in (('impact_velocity', descent_func, DESCENT_CASES, exact_descent), ('peak_g', smd_func, SMD_CASES, exact_smd)):
+                for name, case in cases.items():
+                    value, seconds = _timed(func, case, setting, repeat=repeat)
+                    reference = exact(case, None)
+                    with np.errstate(invalid='ignore'):
+                        error = abs(value - reference) / abs(reference)
+                    records.append({'method': method, 'setting': setting, 'case': name, 'quantity': quantity,
+                                    'value': float(value), 'reference': reference, 'error': float(error) if np.isfinite(error) else np.inf, 'seconds': seconds})
+    return records
+
+
+def summarize(records):
+    '''Worst error and total time over all cases, per method and setting.'''
+    summary = {}
+    for r in records:
+        entry = summary.setdefault((r['method'], r['setting']), {'method': r['method'], 'setting': r['setting'], 'error': 0.0, 'seconds': 0.0})
+        entry['error'] = max(entry['error'], r['error'])
+        entry['seconds'] += r['seconds']
+    return list(summary.values())
+
+
+def recommend(records, tolerance=1e-3):
+    '''
+    Cheapest setting of each method whose worst-case error is within tolerance.
+
+    Returns ({method: summary entry or None}, overall cheapest entry or None).
+    '''
+    best = {}
+    for entry in summarize(records):
+        current = best.get(entry['method'])
+        if entry['error'] <= tolerance and (current is None or entry['seconds'] < current['seconds']):
+            best[entry['method']] = entry
+    methods = {method: best.get(method) for method in dict.fromkeys(r['method'] for r in records)}
+    candidates = [entry for entry in best.values()]
+    return methods, min(candidates, key=lambda e: e['seconds']) if candidates else None
+
+
+def plot_work_precision(records, path):
+    '''Work-precision curves (worst error vs total time) per method, saved headless.'''
+    import report
+
+    fig, ax = report.subplots(figsize=(8, 6))
+    summary = summarize(records)
+    for method in dict.fromkeys(e['method'] for e in summary):
+        entries = [e for e in summary if e['method'] == method and np.isfinite(e['error'])]
+        if not entries:
+            continue
+        ax.loglog([e['seconds'] for e in entries], [max(e['error'], 1e-16) for e in entries], 'o-', label=method)
+        for e in entries:
+            if e['setting'] is not None:
+                ax.annotate(f"{e['setting']:g}", (e['seconds'], max(e['error'], 1e-16)), textcoords='offset points', xytext=(4, 4), fontsize=8)
+    ax.set_xlabel('Wall time for all cases (s)')
+    ax.set_ylabel('Worst relative error (impact velocity, peak g)')
+    ax.set_title('Work-Precision of the Integrators')
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    return report.save_figure(fig, path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Accuracy versus cost benchmark of the project's integrators.")
+    parser.add_argument('--tolerance', type=float, default=1e-3, help="Relative error required for a recommendation")
+    parser.add_argument('--output', default=None, help="Save the work-precision figure to this file")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing repeats (best is kept)")
+    args = parser.parse_args()
+
+    records = run_benchmark(repeat=args.repeat)
+    print(f"{'method':<10} {'setting':>10} {'worst error':>12} {'time (s)':>10}")
+    for e in summarize(records):
+        setting = '-' if e['setting'] is None else f"{e['setting']:g}"
+        print(f"{e['method']:<10} {setting:>10} {e['error']:>12.3e} {e['seconds']:>10.5f}")
+    methods, overall = recommend(records, args.tolerance)
+    print(f"\nCheapest settings within a relative error of {args.tolerance:g}:")
+    for method, entry in methods.items():
+        print(f"  {method:<10} " + ('none meets the tolerance' if entry is None else f"setting {entry['setting']}, {entry['seconds']:.5f} s, error {entry['error']:.2e}"))
+    if overall is not None:
+        print(f"Recommended default: {overall['method']} with setting {overall['setting']}")
+    numerical = [entry for method, entry in methods.items() if method != 'exact' and entry is not None]
+    if numerical:
+        entry = min(numerical, key=lambda e: e['seconds'])
+        print(f"Recommended numerical integrator: {entry['method']} with setting {entry['setting']}")
+    if args.output:
+        plot_work_precision(records, args.output)
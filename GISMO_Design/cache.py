@@ -0,0 +1,205 @@
+'''
+Opt-in on-disk cache for simulation and optimization results.
+
+Results are stored in a SQLite file, keyed by a hash of the function name and all of
+its inputs. Every key also includes a version salt built from the source code of the
+model modules, so editing any of them invalidates old entries. The model modules are
+SALTED_MODULES plus every local module they import, directly or not (ODEs.py,
+trajectory.py, thrust.py, gradient.py, ...), so new dependencies are picked up.
+The file is kept under a size limit by evicting the least recently used entries.
+
+The cache is off by default. Turn it on with enable(), or by setting the GISMO_CACHE
+environment variable to the path of the cache file before importing func_def.
+'''
+import ast
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+
+import numpy as np
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024 # 512 MB
+SALTED_MODULES = ['func_def.py', 'design.py', 'mastercurves.py', 'tradecurves.py'] # Their local imports are followed
+
+_cache = None
+
+
+def salted_modules():
+    '''SALTED_MODULES and all local modules they import (at any depth), sorted.'''
+    here = os.path.dirname(os.path.abspath(__file__))
+    found = set()
+    pending = list(SALTED_MODULES)
+    while pending:
+        name = pending.pop()
+        path = os.path.join(here, name)
+        if name in found or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending += [alias.name.split('.')[0] + '.py' for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0] + '.py')
+    return sorted(found)
+
+
+def version_salt():
+    '''Hash of CACHE_VERSION and the source of the model modules.'''
+    h = hashlib.sha256(str(CACHE_VERSION).encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in salted_modules():
+        with open(os.path.join(here, name), 'rb') as f:
+            h.update(name.encode() + f.read())
+    return h.hexdigest()
+
+
+def _update_hash(h, value):
+    # Hash values by content, with a type tag so e.g. 1 and 1.0 and [1] stay distinct
+    if isinstance(value, np.ndarray):
+        h.update(b'ndarray' + str(value.dtype).encode() + str(value.shape).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b'dict')
+        for key in sorted(value):
+            _update_hash(h, key)
+            _update_hash(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(type(value).__name__.encode() + str(len(value)).encode())
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, (np.floating, np.integer)):
+        _update_hash(h, value.item())
+    else:
+        h.update(type(value).__name__.encode() + repr(value).encode())
+
+
+def make_key(name, args, kwargs, salt):
+    h = hashlib.sha256(salt.encode() + name.encode())
+    _update_hash(h, list(args))
+    _update_hash(h, dict(kwargs))
+    return h.hexdigest()
+
+
+class ResultCache:
+    '''SQLite key/value store with a total size limit and LRU eviction.'''
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, salt=None):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.salt = salt if salt is not None else version_salt()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = None
+        self._pid = None
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, salt TEXT, value BLOB, size INTEGER, last_used REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+        # Entries written by a different version of the model can never be hit again
+        self.db.execute('DELETE FROM entries WHERE salt != ?', (self.salt,))
+        self.db.commit()
+
+    @property
+    def db(self):
+        # SQLite connections must not be shared with forked worker processes
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        '''Return (True, value) on a hit and (False, None) on a miss.'''
+        row = self.db.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.db.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        self.hits += 1
+        return True, pickle.loads(row[0])
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, self.salt, blob, len(blob), time.time()))
+        self.evict()
+        self.db.commit()
+
+    def evict(self):
+        '''Drop least recently used entries until the cache fits in max_bytes.'''
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute('SELECT key, size FROM entries ORDER BY last_used').fetchall():
+            self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def size(self):
+        return self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def clear(self):
+        self.db.execute('DELETE FROM entries')
+        self.db.commit()
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+
+def enable(path='~/.cache/gismo/results.sqlite', max_bytes=DEFAULT_MAX_BYTES):
+    '''Turn on caching for every function decorated with memoize.'''
+    global _cache
+    disable()
+    _cache = ResultCache(path, max_bytes=max_bytes)
+    # Lets worker processes started later pick up the same cache
+    os.environ['GISMO_CACHE'] = _cache.path
+    return _cache
+
+
+def disable():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+    os.environ.pop('GISMO_CACHE', None)
+
+
+def get_cache():
+    return _cache
+
+
+def memoize(func):
+    '''Cache the results of func in the active ResultCache (if caching is enabled).'''
+    name = func.__module__ + '.' + func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _cache is None:
+            return func(*args, **kwargs)
+        key = make_key(name, args, kwargs, _cache.salt)
+        hit, value = _cache.get(key)
+        if hit:
+            return value
+        value = func(*args, **kwargs)
+        _cache.put(key, value)
+        return value
+    return wrapper
+
+
+if os.environ.get('GISMO_CACHE'):
+    _cache = ResultCache(os.environ['GISMO_CACHE'])
@@ -0,0 +1,280 @@
+'''
+This module holds the design problem solved by main.py as reusable functions.
+
+Settings are plain dictionaries using the same names (and imperial units) as the
+"USER SETTINGS" block in main.py. They are converted to SI units once with to_si()
+and the result is passed to the objective function and optimizer.
+'''
+from func_def import simulate_smd, simulate_descent, stopped_smd_trajectory, descent_trajectory
+from thrust import ThrustProfile
+from cache import memoize
+from gradient import BatchGradient
+import numpy as np
+from scipy.optimize import minimize
+
+# Miscellaneous Constants
+g = 9.81 # Gravity
+rho = 1.225 # Air density in kg/m^3
+data_points = 1000 # Number of data points to be taken
+
+# Same values as the USER SETTINGS block in main.py
+DEFAULT_SETTINGS = {
+    'deployment_height_ft': 450,
+    'initial_deployment_velocity_fts': 13,
+    'mass_payload_lb': 6.61,
+    'simulation_duration_d': 40,
+    'drag_coefficient': 0.3,
+    'area_in': 16.82,
+    'mass_capsule_lb': 0.5,
+    'initial_displacement_in': 0,
+    'max_displacement_in': 6,
+    'simulation_duration_smd': 1,
+    'min_k': 0.0000001,
+    'max_k': 999999,
+    'min_c': 0.00000001,
+    'max_c': 999999999,
+    'min_thrust': 0,
+    'max_thrust': None, # None means 90% of the payload weight, as in main.py
+    'weight': 0.4,
+    'bumper_stiffness': None, # N/m of an end stop bumper at +/- max_displacement_in, None for no stop
+    'bumper_damping': 0, # Ns/m
+    'initial_guess': [50, 5, 20],
+}
+
+
+def make_settings(overrides=None):
+    '''Return a full settings dictionary, filling anything missing with the defaults.'''
+    settings = dict(DEFAULT_SETTINGS)
+    if overrides:
+        unknown = set(overrides) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown setting(s): {', '.join(sorted(unknown))}")
+        settings.update(overrides)
+    if settings['max_thrust'] is None:
+        settings['max_thrust'] = settings['mass_payload_lb'] * 4.44822 * .9
+    return settings
+
+
+def to_si(settings):
+    '''Convert a settings dictionary into the SI quantities used by the simulations.'''
+    s = make_settings(settings)
+    return {
+        'deployment_height_m': s['deployment_height_ft'] * 0.3048,
+        'initial_deployment_velocity_ms': s['initial_deployment_velocity_fts'] * 0.3048,
+        'mass_payload_kg': s['mass_payload_lb'] * 0.45359237,
+        'mass_capsule_kg': s['mass_capsule_lb'] * 0.45359237,
+        'initial_displacement_m': s['initial_displacement_in'] * 0.0254,
+        'max_displacement_m': s['max_displacement_in'] * 0.0254,
+        'max_displacement_in': s['max_displacement_in'],
+        'drag_coefficient': s['drag_coefficient'],
+        'area_m': s['area_in'] * 0.00064516,
+        'weight': s['weight'],
+        'bumper_stiffness': s['bumper_stiffness'],
+        'bumper_damping': s['bumper_damping'],
+        'bounds': [(s['min_k'], s['max_k']), (s['min_c'], s['max_c']), (s['min_thrust'], s['max_thrust'])],
+        'initial_guess': list(s['initial_guess']),
+        # Array of time points for simulations
+        't_smd': np.linspace(0, s['simulation_duration_smd'], data_points),
+        't_d': np.linspace(0, s['simulation_duration_d'], data_points),
+    }
+
+
+def impact_velocity(si, thrust):
+    '''Velocity of the payload where the descent height is closest to zero.'''
+    height, velocity_descent, _ = simulate_descent(si['initial_deployment_velocity_ms'], si['deployment_height_m'], rho, si['mass_payload_kg'], si['drag_coefficient'], si['area_m'], thrust, si['t_d'])
+    return velocity_descent[(np.abs(height)).argmin()]
+
+
+def smd_metrics(si, k, c, impact_velocity):
+    '''Max g force and total stroke (inches) of the SMD for a given impact velocity.'''
+    if si['bumper_stiffness'] is not None:
+        # Contact spikes last a few ms, so take the exact peaks instead of sampling
+        trajectory = stop_trajectory(si, k, c, impact_velocity)
+        t_end = si['t_smd'][-1]
+        return trajectory.peak_acceleration(t_end) / g, trajectory.stroke(t_end) * 39.3701
+    displacement, _, acceleration = simulate_smd(si['initial_displacement_m'], impact_velocity, si['mass_capsule_kg'], c, k, si['t_smd'])
+    max_g_force = np.max(np.abs(acceleration)) / g
+    stroke_in = (max(displacement) - min(displacement)) * 39.3701 # Convert meters to inches
+    return max_g_force, stroke_in
+
+
+def smd_response(si, k, c, impact_velocity):
+    '''Displacement, velocity and acceleration of the SMD on t_smd, against the end stop bumper if there is one.'''
+    if si['bumper_stiffness'] is not None:
+        return simulate_smd(si['initial_displacement_m'], impact_velocity, si['mass_capsule_kg'], c, k, si['t_smd'], stop=si['max_displacement_m'], bumper_k=si['bumper_stiffness'], bumper_c=si['bumper_damping'])
+    return simulate_smd(si['initial_displacement_m'], impact_velocity, si['mass_capsule_kg'], c, k, si['t_smd'])
+
+
+def stop_trajectory(si, k, c, impact_velocity):
+    '''SMD motion with the end stop bumper of the settings (see trajectory.StoppedSMDTrajectory).'''
+    return stopped_smd_trajectory(si['initial_displacement_m'], impact_velocity, si['mass_capsule_kg'], c, k, si['max_displacement_m'], si['t_smd'][-1], si['bumper_stiffness'], si['bumper_damping'])
+
+
+def contact_report(si, k, c, impact_velocity):
+    '''Contact count, contact velocities (m/s) and peak contact g against the end stop.'''
+    if si['bumper_stiffness'] is None:
+        raise ValueError("No end stop: set bumper_stiffness")
+    return stop_trajectory(si, k, c, impact_velocity).contact_summary()
+
+
+def objective_function(params, si):
+    '''Same objective as main.py: displacement error plus weighted max g force.'''
+    k, c, thrust = params
+    max_g_force, stroke_in = smd_metrics(si, k, c, impact_velocity(si, thrust))
+    displacement_error = np.abs(si['max_displacement_in'] - stroke_in)
+    return displacement_error + si['weight'] * max_g_force
+
+
+@memoize
+def optimize(settings=None, gradient=None, workers=None):
+    '''
+    Run the main.py optimization for one set of settings.
+
+    gradient picks a batched finite-difference method of gradient.BatchGradient
+    ('2-point' or '3-point') evaluated on workers processes; None keeps the
+    sequential differences of minimize. Complex step ('cs') is not offered because
+    odeint drops the imaginary part, which would give a zero gradient. Returns a flat
+    dictionary of the optimized parameters and the resulting impact velocity, g force
+    and stroke (imperial units, like main.py prints).
+    '''
+    if gradient == 'cs':
+        raise ValueError("Complex step needs an objective that accepts complex parameters; objective_function goes through odeint, use '2-point' or '3-point'")
+    si = to_si(settings)
+    if gradient is None:
+        result = minimize(objective_function, si['initial_guess'], args=(si,), bounds=si['bounds'])
+    else:
+        with BatchGradient(objective_function, args=(si,), method=gradient, workers=workers, bounds=si['bounds']) as batch:
+            result = minimize(batch.value_and_grad, si['initial_guess'], jac=True, bounds=si['bounds'])
+        result.nfev = batch.nfev
+    k, c, thrust = result.x
+    v_impact = impact_velocity(si, thrust)
+    max_g_force, stroke_in = smd_metrics(si, k, c, v_impact)
+    return {
+        'k': float(k),
+        'c': float(c),
+        'thrust': float(thrust),
+        'impact_velocity_fts': float(v_impact * 3.28084),
+        'max_g_force': float(max_g_force),
+        'total_displacement_in': float(stroke_in),
+        'objective': float(result.fun),
+        'success': bool(result.success),
+        'nfev': int(result.nfev),
+    }
+
+
+def thrust_for_impact_velocity(si, target_velocity):
+    '''
+    Constant thrust (N) giving the target impact velocity (m/s).
+
+    The closed-form descent solution (see tradecurves) is linear in the net
+    acceleration g - thrust / m, so the thrust is found directly instead of by
+    repeated descent solves. Raises ValueError if the target can't be met within
+    the thrust bounds.
+    '''
+    m = si['mass_payload_kg']
+    H = si['deployment_height_m']
+    v0 = si['initial_deployment_velocity_ms']
+    k = rho * si['drag_coefficient'] * si['area_m'] / (2 * m)
+    growth = -np.expm1(-2 * k * H) / k if k > 0 else 2 * H
+    a = (target_velocity ** 2 - v0 ** 2 * np.exp(-2 * k * H)) / growth
+    thrust = m * (g - a)
+    min_thrust, max_thrust = si['bounds'][2]
+    if not min_thrust - 1e-9 <= thrust <= max_thrust + 1e-9:
+        raise ValueError(f"Impact velocity {target_velocity:.3f} m/s needs {thrust:.2f} N of thrust, outside the bounds [{min_thrust:.2f}, {max_thrust:.2f}] N")
+    return float(np.clip(thrust, min_thrust, max_thrust))
+
+
+def smd_objective(params, si, impact_velocity):
+    '''objective_function with the impact velocity already known (k and c only).'''
+    k, c = params
+    max_g_force, stroke_in = smd_metrics(si, k, c, impact_velocity)
+    return np.abs(si['max_displacement_in'] - stroke_in) + si['weight'] * max_g_force
+
+
+@memoize
+def optimize_decomposed(settings=None, target_impact_velocity_fts=None, thrust=None):
+    '''
+    Decomposed version of optimize(): fix the thrust first, then optimize k and c.
+
+    Thrust only changes the impact velocity, so the thrust is either solved for a
+    target impact velocity (target_impact_velocity_fts) or taken as a given thrust
+    budget (thrust, N). By default the full max_thrust is used, which gives the
+    lowest impact velocity. The descent is then solved once and k and c are
+    optimized in 2-D at that fixed impact velocity. Returns the same dictionary
+    as optimize().
+    '''
+    si = to_si(settings)
+    if target_impact_velocity_fts is not None and thrust is not None:
+        raise ValueError("Give either target_impact_velocity_fts or thrust, not both")
+    if target_impact_velocity_fts is not None:
+        thrust = thrust_for_impact_velocity(si, target_impact_velocity_fts * 0.3048)
+    elif thrust is None:
+        thrust = si['bounds'][2][1]
+    v_impact = impact_velocity(si, thrust)
+
+    result = minimize(smd_objective, si['initial_guess'][:2], args=(si, v_impact), bounds=si['bounds'][:2])
+    k, c = result.x
+    max_g_force, stroke_in = smd_metrics(si, k, c, v_impact)
+    return {
+        'k': float(k),
+        'c': float(c),
+        'thrust': float(thrust),
+        'impact_velocity_fts': float(v_impact * 3.28084),
+        'max_g_force': float(max_g_force),
+        'total_displacement_in': float(stroke_in),
+        'objective': float(result.fun),
+        'success': bool(result.success),
+        'nfev': int(result.nfev),
+    }
+
+
+def burn_impact_velocity(si, profile):
+    '''Exact impact velocity (m/s) of the descent under a thrust.ThrustProfile.'''
+    return descent_trajectory(si['initial_deployment_velocity_ms'], si['deployment_height_m'], rho, si['mass_payload_kg'], si['drag_coefficient'], si['area_m'], profile).impact_velocity
+
+
+def burn_objective(params, si, burn_thrust):
+    '''objective_function with a single burn instead of a constant thrust.'''
+    k, c, ignition_height, burn_duration = params
+    profile = ThrustProfile.burn(burn_thrust, burn_duration, ignition_height=ignition_height)
+    max_g_force, stroke_in = smd_metrics(si, k, c, burn_impact_velocity(si, profile))
+    return np.abs(si['max_displacement_in'] - stroke_in) + si['weight'] * max_g_force
+
+
+@memoize
+def optimize_burn(settings=None, burn_thrust=None, total_impulse=None, max_burn_time=None):
+    '''
+    optimize() for a motor with a finite burn: choose k, c, the ignition height and the burn duration.
+
+    The motor gives burn_thrust (N, default max_thrust, and unlike the constant thrust
+    of optimize() it may exceed the weight) for up to total_impulse / burn_thrust or
+    max_burn_time seconds (the whole descent by default). Each evaluation solves the
+    descent in closed form per burn phase (see thrust.py). Returns the dictionary of
+    optimize() plus ignition_height_ft and burn_duration_s.
+    '''
+    si = to_si(settings)
+    s = make_settings(settings)
+    burn_thrust = si['bounds'][2][1] if burn_thrust is None else burn_thrust
+    if total_impulse is not None:
+        max_burn_time = total_impulse / burn_thrust
+    elif max_burn_time is None:
+        max_burn_time = s['simulation_duration_d']
+    bounds = si['bounds'][:2] + [(0, si['deployment_height_m']), (0, max_burn_time)]
+    initial_guess = si['initial_guess'][:2] + [0.5 * si['deployment_height_m'], 0.5 * max_burn_time]
+    result = minimize(burn_objective, initial_guess, args=(si, burn_thrust), bounds=bounds)
+    k, c, ignition_height, burn_duration = result.x
+    v_impact = burn_impact_velocity(si, ThrustProfile.burn(burn_thrust, burn_duration, ignition_height=ignition_height))
+    max_g_force, stroke_in = smd_metrics(si, k, c, v_impact)
+    return {
+        'k': float(k),
+        'c': float(c),
+        'thrust': float(burn_thrust),
+        'ignition_height_ft': float(ignition_height * 3.28084),
+        'burn_duration_s': float(burn_duration),
+        'impact_velocity_fts': float(v_impact * 3.28084),
+        'max_g_force': float(max_g_force),
+        'total_displacement_in': float(stroke_in),
+        'objective': float(result.fun),
+        'success': bool(result.success),
+        'nfev': int(result.nfev),
+    }
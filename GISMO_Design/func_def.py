@@ -1,8 +1,17 @@
 from scipy.integrate import odeint
 from ODEs import spring_mass_damper, descent
 import numpy as np
+from cache import memoize
+from trajectory import SMDTrajectory, DescentTrajectory, StoppedSMDTrajectory
+from thrust import ThrustProfile, PiecewiseDescent
+
+@memoize
+def simulate_smd(initial_displacement, initial_velocity, m_capsule, c, k, t, stop=None, bumper_k=None, bumper_c=0.0, restitution=0.0):
+    if stop is not None:
+        # End-of-travel stop at +/- stop (m): piecewise closed form, see trajectory.py
+        trajectory = StoppedSMDTrajectory(initial_displacement, initial_velocity, m_capsule, c, k, stop, t[-1], bumper_k, bumper_c, restitution)
+        return trajectory.sample(t)
 
-def simulate_smd(initial_displacement, initial_velocity, m_capsule, c, k, t):
     initial_conditions = [initial_displacement, initial_velocity]
 
     # Solve the system
@@ -14,7 +23,11 @@ def simulate_smd(initial_displacement, initial_velocity, m_capsule, c, k, t):
     acceleration = np.gradient(velocity, t)
     return displacement, velocity, acceleration
 
+@memoize
 def simulate_descent(initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust, t):
+    if isinstance(thrust, ThrustProfile):
+        # Time-varying thrust: solved segment by segment in closed form, see thrust.py
+        return PiecewiseDescent(initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust).sample(t)
 
     initial_state = [initial_velocity, initial_height]
     solution = odeint(descent, initial_state, t, args=(rho, mass, drag_coefficient, area, thrust))
@@ -22,4 +35,18 @@ def simulate_descent(initial_velocity, initial_height, rho, mass, drag_coefficie
     velocity = solution[:,0]
     acceleration = np.gradient(velocity, t)
     height = solution[:,1]
-    return height, velocity, acceleration
\ No newline at end of file
+    return height, velocity, acceleration
+
+def smd_trajectory(initial_displacement, initial_velocity, m_capsule, c, k):
+    # Lazy, closed-form alternative to simulate_smd (see trajectory.py)
+    return SMDTrajectory(initial_displacement, initial_velocity, m_capsule, c, k)
+
+def stopped_smd_trajectory(initial_displacement, initial_velocity, m_capsule, c, k, stop, t_end, bumper_k=None, bumper_c=0.0, restitution=0.0):
+    # SMD with an end-of-travel stop, with contact count/velocity/peak g (see trajectory.py)
+    return StoppedSMDTrajectory(initial_displacement, initial_velocity, m_capsule, c, k, stop, t_end, bumper_k, bumper_c, restitution)
+
+def descent_trajectory(initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust):
+    # Lazy alternative to simulate_descent (see trajectory.py and thrust.py)
+    if isinstance(thrust, ThrustProfile):
+        return PiecewiseDescent(initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust)
+    return DescentTrajectory(initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust)
@@ -0,0 +1,125 @@
+'''
+Batched finite-difference gradients for minimize.
+
+Without jac=, minimize (L-BFGS-B) estimates the gradient by calling the objective at
+one perturbed point per parameter, one after another, and each call re-runs the
+descent and SMD solves. BatchGradient builds the base point and all perturbed points
+first and evaluates them in one batch: in a pool of worker processes (kept warm
+between gradients), or in a single call for vectorized objectives. It returns the
+value and the gradient together, for minimize(..., jac=True):
+
+    with BatchGradient(design.objective_function, args=(si,), workers=4) as gradient:
+        minimize(gradient.value_and_grad, x0, jac=True, bounds=bounds)
+
+Steps are relative to max(|x|, scale) per parameter, so parameters of very different
+magnitude (k from 1e-7 to 1e6, c up to 1e9) are all perturbed in their own units.
+Methods: '2-point' (forward), '3-point' (central) and 'cs' (complex step, exact to
+rounding but only for objectives that accept complex parameters, which odeint-based
+ones don't).
+'''
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+EPS = np.finfo(float).eps
+RELATIVE_STEP = {'2-point': EPS ** 0.5, '3-point': EPS ** (1 / 3), 'cs': EPS ** 0.5}
+
+
+def _call(fun, args, x):
+    return fun(x, *args)
+
+
+def _limits(bounds, n):
+    lower = np.full(n, -np.inf) if bounds is None else np.array([-np.inf if b[0] is None else b[0] for b in bounds], dtype=float)
+    upper = np.full(n, np.inf) if bounds is None else np.array([np.inf if b[1] is None else b[1] for b in bounds], dtype=float)
+    return lower, upper
+
+
+def step_sizes(x, method='2-point', scale=None, bounds=None):
+    '''
+    Steps and their direction for every parameter of x.
+
+    Each step is RELATIVE_STEP[method] * max(|x|, scale), with scale (the typical
+    magnitude of each parameter) defaulting to 1. The direction is +1 (forward), -1
+    (backward) or, for '3-point', 0 (central); differences that would leave the
+    bounds are taken one-sided towards the inside instead. Returns (h, direction).
+    '''
+    x = np.asarray(x, dtype=float)
+    scale = np.ones_like(x) if scale is None else np.broadcast_to(np.asarray(scale, dtype=float), x.shape)
+    h = RELATIVE_STEP[method] * np.maximum(np.abs(x), scale)
+    lower, upper = _limits(bounds, len(x))
+    reach = 2 * h if method == '3-point' else h # One-sided 3-point differences use x + 2h
+    forward_ok = x + reach <= upper
+    backward_ok = x - reach >= lower
+    if method == '3-point':
+        direction = np.where((x + h <= upper) & (x - h >= lower), 0, np.where(forward_ok | ~backward_ok, 1, -1))
+    else:
+        direction = np.where(forward_ok | ~backward_ok, 1, -1)
+    return h, direction
+
+
+class BatchGradient:
+    '''
+    Finite-difference gradient of fun(x, *args) from one batch of evaluations.
+
+    workers > 1 evaluates the batch in a process pool (fun and args must be picklable);
+    vectorized=True instead calls fun once with an (n_points, n) array and expects
+    n_points values. Use as a context manager (or call close()) to shut the pool down.
+    '''
+
+    def __init__(self, fun, args=(), method='2-point', workers=None, vectorized=False, scale=None, bounds=None):
+        if method not in RELATIVE_STEP:
+            raise ValueError(f"Unknown method {method!r}, use one of {', '.join(RELATIVE_STEP)}")
+        self.fun = fun
+        self.args = tuple(args)
+        self.method = method
+        self.vectorized = vectorized
+        self.scale = scale
+        self.bounds = bounds
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 and not vectorized else None
+        self.nfev = 0 # Objective evaluations, including the perturbed points
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def evaluate(self, points):
+        '''Objective at every row of points, as one batch.'''
+        self.nfev += len(points)
+        if self.vectorized:
+            return np.asarray(self.fun(points, *self.args))
+        if self.pool is not None:
+            return np.array(list(self.pool.map(_call, [self.fun] * len(points), [self.args] * len(points), list(points))))
+        return np.array([self.fun(x, *self.args) for x in points])
+
+    def value_and_grad(self, x):
+        '''(f(x), gradient of f at x) for minimize(..., jac=True).'''
+        x = np.asarray(x, dtype=float)
+        n = len(x)
+        h, direction = step_sizes(x, self.method, self.scale, self.bounds)
+        if self.method == 'cs':
+            values = self.evaluate(np.vstack([x.astype(complex), x + np.diag(h * 1j)]))
+            return float(np.real(values[0])), np.imag(values[1:]) / h
+        # Use the steps actually represented in floating point
+        sign = np.where(direction == 0, 1, direction)
+        h = (x + sign * h) - x
+        if self.method == '2-point':
+            values = self.evaluate(np.vstack([x, x + np.diag(h)]))
+            return float(values[0]), (values[1:] - values[0]) / h
+        # Central: f(x + h), f(x - h); one-sided: f(x + h), f(x + 2h) with h signed
+        second = np.where(direction == 0, -h, 2 * h)
+        values = self.evaluate(np.vstack([x, x + np.diag(h), x + np.diag(second)]))
+        f0, f1, f2 = values[0], values[1:n + 1], values[n + 1:]
+        gradient = np.where(direction == 0, (f1 - f2) / (2 * h), (4 * f1 - 3 * f0 - f2) / (2 * h))
+        return float(f0), gradient
+
+    def __call__(self, x):
+        '''Gradient only, for minimize(..., jac=gradient).'''
+        return self.value_and_grad(x)[1]
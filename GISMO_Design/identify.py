@@ -0,0 +1,280 @@
+'''
+Identification of the SMD spring constant k and damping coefficient c from drop tests.
+
+The log of a drop test (time, acceleration and optionally displacement of the capsule,
+starting at impact) is read in chunks and fed to a recursive least squares estimator.
+With K = k / m and C = c / m the model of ODEs.spring_mass_damper is
+
+    a = -K x - C v
+
+where v and x are the integrals of the measured acceleration plus the unknown impact
+velocity v0 (v = v0 + V, x = v0 t + X). Expanding the products with v0 keeps the
+model linear in its unknowns, so every sample is an O(1) update of a small set of
+normal equations and the whole log is processed in one streaming pass. A fixed-size
+decimated copy of the log is kept for an optional least squares refinement of k, c
+and v0 against the exact SMD response, which is also where the confidence intervals
+come from.
+
+Supported logs: .csv with a header (columns t/time, a/acceleration, x/displacement),
+.npy arrays of shape (samples, 2 or 3) and raw little-endian float64 records (.bin,
+.dat) with 2 or 3 values per sample, all in the same column order and SI units.
+'''
+import csv
+import itertools
+import os
+
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.stats import t as student_t
+
+from func_def import smd_trajectory
+
+CHUNK_SIZE = 100000 # Samples read per chunk
+REFINE_POINTS = 20000 # Max samples kept for the batch refinement
+UPDATE_BUFFER = 1024 # Single samples from update() are processed in blocks of this size
+COLUMN_NAMES = {'t': 't', 'time': 't', 'a': 'a', 'acceleration': 'a', 'x': 'x', 'displacement': 'x'}
+
+
+def read_log(path, chunk_size=CHUNK_SIZE, columns=2, accel_scale=1.0):
+    '''
+    Yield (t, a, x) chunks of a drop test log, x is None when there is no displacement.
+
+    columns is the number of values per sample in raw binary logs (2 or 3). The
+    acceleration is multiplied by accel_scale (e.g. 9.81 for logs in g).
+    '''
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = [name.strip().lower() for name in next(reader)]
+            index = {COLUMN_NAMES[name]: i for i, name in enumerate(header) if name in COLUMN_NAMES}
+            if 't' not in index or 'a' not in index:
+                raise ValueError(f"{path} needs time and acceleration columns, found {header}")
+            while True:
+                rows = list(itertools.islice(reader, chunk_size))
+                if not rows:
+                    return
+                data = np.array(rows, dtype=float)
+                yield data[:, index['t']], data[:, index['a']] * accel_scale, data[:, index['x']] if 'x' in index else None
+    if ext == '.npy':
+        data = np.load(path, mmap_mode='r')
+    elif ext in ('.bin', '.dat'):
+        data = np.memmap(path, dtype='<f8', mode='r').reshape(-1, columns)
+    else:
+        raise ValueError(f"Unsupported log file type: {path}")
+    for start in range(0, len(data), chunk_size):
+        chunk = np.array(data[start:start + chunk_size], dtype=float)
+        yield chunk[:, 0], chunk[:, 1] * accel_scale, chunk[:, 2] if chunk.shape[1] > 2 else None
+
+
+class RecursiveSMDEstimator:
+    '''
+    Streaming least squares estimate of k, c (and the impact velocity) from samples.
+
+    The estimator keeps the normal equations of the linear model (information form of
+    recursive least squares) plus the running integrals of the acceleration, so memory
+    and work per sample are constant. Call update() per sample (buffered and processed
+    in blocks) or update_chunk() with arrays, then estimate() at any time.
+    '''
+
+    def __init__(self, m_capsule, impact_velocity=None, keep=REFINE_POINTS):
+        self.m_capsule = m_capsule
+        self.impact_velocity = impact_velocity
+        self.keep = keep
+        self.n = 0
+        self.has_displacement = None
+        self.t0 = None
+        self.last = None # (tau, a, V, X) of the previous sample
+        self.R = None
+        self.r = None
+        self.aa = 0.0
+        # Decimated copy of the log for refine(): every stride-th sample
+        self.stride = 1
+        self.kept = []
+        self.n_kept = 0
+        self.pending = [] # (t, a, x) of samples from update() not processed yet
+
+    def _regressors(self, tau, V, X, x):
+        position = x if x is not None else X
+        v0 = self.impact_velocity
+        if v0 is not None:
+            if x is None:
+                position = position + v0 * tau
+            return np.stack([-position, -(V + v0)], axis=-1)
+        if x is None:
+            return np.stack([-position, -V, -tau, -np.ones_like(tau)], axis=-1)
+        return np.stack([-position, -V, -np.ones_like(tau)], axis=-1)
+
+    def update(self, t, a, x=None):
+        '''Add one sample (time, acceleration and optional displacement).'''
+        self._check_displacement(x)
+        self.pending.append((t, a, x))
+        if len(self.pending) >= UPDATE_BUFFER:
+            self._flush()
+
+    def update_chunk(self, t, a, x=None):
+        '''Add a chunk of consecutive samples.'''
+        self._flush()
+        t = np.asarray(t, dtype=float)
+        a = np.asarray(a, dtype=float)
+        if len(t) == 0:
+            return
+        self._check_displacement(x)
+        self._add(t, a, None if x is None else np.asarray(x, dtype=float))
+
+    def _check_displacement(self, x):
+        if self.has_displacement is None:
+            self.has_displacement = x is not None
+        elif self.has_displacement != (x is not None):
+            raise ValueError("Every sample must either have displacement or not")
+
+    def _flush(self):
+        if self.pending:
+            t, a, x = zip(*self.pending)
+            self.pending = []
+            self._add(np.array(t, dtype=float), np.array(a, dtype=float), np.array(x, dtype=float) if self.has_displacement else None)
+
+    def _add(self, t, a, x):
+        if self.t0 is None:
+            self.t0 = t[0]
+        tau = t - self.t0
+
+        # Running trapezoidal integrals, continued from the end of the previous chunk
+        if self.last is None:
+            tau_prev, a_prev, V_prev, X_prev = tau[0], a[0], 0.0, 0.0
+        else:
+            tau_prev, a_prev, V_prev, X_prev = self.last
+        dt = np.diff(tau, prepend=tau_prev)
+        V = V_prev + np.cumsum(0.5 * (a + np.concatenate([[a_prev], a[:-1]])) * dt)
+        X = X_prev + np.cumsum(0.5 * (V + np.concatenate([[V_prev], V[:-1]])) * dt)
+        self.last = (tau[-1], a[-1], V[-1], X[-1])
+
+        phi = self._regressors(tau, V, X, x)
+        if self.R is None:
+            self.R = np.zeros((phi.shape[1], phi.shape[1]))
+            self.r = np.zeros(phi.shape[1])
+        self.R += phi.T @ phi
+        self.r += phi.T @ a
+        self.aa += a @ a
+
+        index = self.n + np.arange(len(t))
+        take = index % self.stride == 0
+        if take.any():
+            self.kept.append(np.column_stack([tau[take], a[take]]))
+            self.n_kept += len(self.kept[-1])
+        self.n += len(t)
+        if self.n_kept > self.keep:
+            kept = np.concatenate(self.kept)
+            while len(kept) > self.keep:
+                kept = kept[::2]
+                self.stride *= 2
+            self.kept = [kept]
+            self.n_kept = len(kept)
+
+    def estimate(self):
+        '''
+        Current estimate of k, c and v0 with the residual RMS.
+
+        No confidence intervals: the regressors V and X are integrals of the same noisy
+        acceleration, so the least squares covariance would badly understate the
+        uncertainty. Intervals come from refine().
+        '''
+        self._flush()
+        if self.r is None or self.n <= len(self.r):
+            raise ValueError("Not enough samples for an estimate")
+        p = len(self.r)
+        theta = np.linalg.solve(self.R, self.r)
+        ssr = max(self.aa - theta @ self.r, 0.0)
+        m = self.m_capsule
+        result = {
+            'k': float(m * theta[0]),
+            'c': float(m * theta[1]),
+            'residual_rms': float(np.sqrt(ssr / self.n)),
+            'samples': self.n,
+        }
+        if self.impact_velocity is not None:
+            result['impact_velocity'] = float(self.impact_velocity)
+        elif p == 3:
+            # theta = [K, C, C v0]
+            result['impact_velocity'] = float(theta[2] / theta[1])
+        else:
+            # theta = [K, C, K v0, C v0], v0 as the least squares fit of both products
+            result['impact_velocity'] = float((theta[0] * theta[2] + theta[1] * theta[3]) / (theta[0] ** 2 + theta[1] ** 2))
+        return result
+
+    def samples(self):
+        '''The decimated (time since impact, acceleration) samples kept for refine().'''
+        self._flush()
+        return np.concatenate(self.kept) if self.kept else np.empty((0, 2))
+
+
+def refine(m_capsule, tau, a, k, c, impact_velocity, fit_velocity=True, confidence=0.95):
+    '''
+    Batch least squares fit of k, c (and v0) to the exact SMD acceleration.
+
+    The closed-form response (func_def.smd_trajectory) is used rather than
+    simulate_smd: odeint's tolerance would be amplified by the finite difference
+    Jacobian, and with it the covariance behind the intervals.
+
+    Starts from the recursive estimate. Returns the dictionary of
+    RecursiveSMDEstimator.estimate() plus confidence intervals k_ci, c_ci and
+    impact_velocity_ci from the covariance of the fit.
+    '''
+    def residuals(params):
+        k_, c_ = params[:2]
+        v0 = params[2] if fit_velocity else impact_velocity
+        return smd_trajectory(0, v0, m_capsule, c_, k_).acceleration(tau) - a
+
+    start = [k, c, impact_velocity] if fit_velocity else [k, c]
+    fit = least_squares(residuals, start, x_scale='jac')
+    dof = max(len(a) - len(start), 1)
+    ssr = 2 * fit.cost
+    cov = ssr / dof * np.linalg.pinv(fit.jac.T @ fit.jac)
+    z = student_t.ppf(0.5 + confidence / 2, dof)
+    half = z * np.sqrt(np.maximum(np.diag(cov), 0.0))
+    v0 = fit.x[2] if fit_velocity else impact_velocity
+    return {
+        'k': float(fit.x[0]),
+        'c': float(fit.x[1]),
+        'k_ci': (float(fit.x[0] - half[0]), float(fit.x[0] + half[0])),
+        'c_ci': (float(fit.x[1] - half[1]), float(fit.x[1] + half[1])),
+        'impact_velocity': float(v0),
+        'impact_velocity_ci': (float(v0 - half[2]), float(v0 + half[2])) if fit_velocity else (float(v0),) * 2,
+        'residual_rms': float(np.sqrt(ssr / len(a))),
+        'samples': len(a),
+    }
+
+
+def identify(path, m_capsule, impact_velocity=None, refine_fit=True, chunk_size=CHUNK_SIZE, columns=2, accel_scale=1.0):
+    '''
+    Identify k and c (and the impact velocity if not given) from a drop test log.
+
+    Returns {'recursive': ..., 'refined': ...} with the streaming estimate and, if
+    refine_fit is set, the least squares refinement (with confidence intervals) on the
+    decimated log.
+    '''
+    estimator = RecursiveSMDEstimator(m_capsule, impact_velocity)
+    for t, a, x in read_log(path, chunk_size, columns, accel_scale):
+        estimator.update_chunk(t, a, x)
+    result = {'recursive': estimator.estimate()}
+    if refine_fit:
+        first = result['recursive']
+        kept = estimator.samples()
+        result['refined'] = refine(m_capsule, kept[:, 0], kept[:, 1], first['k'], first['c'], first['impact_velocity'], fit_velocity=impact_velocity is None)
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Identify SMD k and c from a drop test log.")
+    parser.add_argument('log', help="Log file (.csv, .npy, .bin/.dat)")
+    parser.add_argument('mass', type=float, help="Capsule mass (kg)")
+    parser.add_argument('--impact-velocity', type=float, default=None, help="Known impact velocity (m/s), estimated if omitted")
+    parser.add_argument('--columns', type=int, default=2, help="Values per sample in raw binary logs")
+    parser.add_argument('--accel-scale', type=float, default=1.0, help="Multiplier converting logged acceleration to m/s^2")
+    parser.add_argument('--no-refine', action='store_true', help="Skip the least squares refinement (and the confidence intervals)")
+    args = parser.parse_args()
+    results = identify(args.log, args.mass, args.impact_velocity, not args.no_refine, columns=args.columns, accel_scale=args.accel_scale)
+    for stage, r in results.items():
+        print(f"{stage}: k = {r['k']:.3f} N/m {r.get('k_ci', '')}, c = {r['c']:.4f} Ns/m {r.get('c_ci', '')}, "
+              f"v0 = {r['impact_velocity']:.3f} m/s {r.get('impact_velocity_ci', '')}, residual RMS = {r['residual_rms']:.4f} m/s^2")
@@ -36,6 +36,9 @@ max_thrust = mass_payload_lb  * 4.44822 * .9  # Max Thrust (Newtons) - ( "mass_p
 
 weight = 0.4 # Balance of priority between displacement and g force
 
+# Report settings
+report_path = None # Set to a file name (e.g. "design.png", ".svg" or ".pdf") to save the plots without opening a window
+
 
 
 #============================== VARIABLE SETUP (IGNORE) ============================== 
@@ -136,6 +139,9 @@ velocity_at_zero_height = velocity_descent_result[zero_height_index]
 
 #============================== PLOTS ============================== 
 
+if report_path:
+    plt.switch_backend('Agg') # Non-GUI backend, nothing is shown on screen
+
 # Font size for the text labels
 label_fontsize = 13  # You can adjust this value as needed
 
@@ -219,4 +225,7 @@ print(f"Maximum Displacement: {max_displacement:.2f} inches")
 print(f"Impact Velocity: {impact_velocity_fts:.2f} ft/s")
 
 plt.tight_layout()
-plt.show()
+if report_path:
+    plt.savefig(report_path)
+else:
+    plt.show()
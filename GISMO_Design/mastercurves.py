@@ -0,0 +1,182 @@
+'''
+Nondimensional master curves for sizing the spring mass damper.
+
+For ODEs.spring_mass_damper starting at zero displacement with impact velocity v0,
+the response only depends on the damping ratio zeta = c / (2 sqrt(k m)) once time is
+scaled by the natural frequency wn = sqrt(k / m):
+
+    total stroke       = v0 / wn * X(zeta)
+    peak acceleration  = v0 * wn * A(zeta)
+
+X and A have closed forms (below) and are tabulated once over zeta. Inverting the two
+scalings gives the (k, c) designs that meet a stroke and g limit directly, without
+running any simulation or optimizer. Everything is in SI units, with g limits in Gs.
+Note the curves describe the full response, not one cut off after a fixed duration.
+'''
+import functools
+
+import numpy as np
+
+g = 9.81 # Gravity
+ZETA_LINEAR = 10 # The table is linear in zeta up to here, then logarithmic up to ZETA_MAX
+ZETA_MAX = 1e6 # Largest damping ratio in the table (larger ones use peak_functions directly)
+TABLE_POINTS = 20001
+TAIL_POINTS = 2001
+
+
+def peak_functions(zeta):
+    '''
+    Nondimensional total stroke X(zeta) and peak acceleration A(zeta).
+
+    Uses the solution of x'' + 2 zeta x' + x = 0, x(0) = 0, x'(0) = 1. The largest
+    displacement is exp(-zeta tp) at the first zero of velocity tp; an underdamped
+    system then overshoots to the opposite side by that peak times exp(-zeta pi / wd).
+    The peak acceleration is either the initial damper kick 2 zeta or the first
+    interior acceleration peak, whichever is larger.
+    '''
+    zeta = np.asarray(zeta, dtype=float)
+    under = zeta < 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wd = np.sqrt(np.abs(1 - zeta ** 2)) # Damped frequency (under) or sqrt(zeta^2 - 1) (over)
+
+        # Underdamped: derivatives of x are exp(-zeta t) sin(wd t + n theta) / wd
+        theta = np.arctan2(wd, -zeta)
+        tp_under = np.arctan2(wd, zeta) / wd
+        overshoot = np.exp(-zeta * np.pi / wd)
+        t1 = (np.floor(3 * theta / np.pi) + 1) * np.pi - 3 * theta
+        a_under = np.exp(-zeta * t1 / wd)
+
+        # Critically/overdamped: x = (exp(r1 t) - exp(r2 t)) / (r1 - r2), never crosses zero.
+        # With r1 r2 = 1, r1 = -1 / (zeta + wd) and log(r2 / r1) = 2 log(zeta + wd) stay
+        # accurate for large zeta, where -zeta + wd would cancel.
+        r1 = -1 / (zeta + wd)
+        r2 = -zeta - wd
+        tp_over = np.where(wd > 0, np.log(zeta + wd) / wd, 1.0)
+        tj = np.where(wd > 0, 3 * np.log(zeta + wd) / wd, 3.0)
+        a_over = np.where(wd > 0, np.abs(r1 ** 2 * np.exp(r1 * tj) - r2 ** 2 * np.exp(r2 * tj)) / (r1 - r2), np.abs(tj - 2) * np.exp(-tj))
+
+    x_peak = np.exp(-zeta * np.where(under, tp_under, tp_over))
+    X = np.where(under, x_peak * (1 + overshoot), x_peak)
+    A = np.maximum(2 * zeta, np.where(under, a_under, a_over))
+    return X, A
+
+
+def sampled_peak_functions(zeta, tau_end, delta):
+    '''
+    X(zeta) and A(zeta) as main.py's odeint path measures them.
+
+    The response is cut off at tau_end and the acceleration is np.gradient of the
+    velocity sampled every delta (both in units of 1 / wn). The stroke is taken over
+    the first two velocity zeros and the window end, and the peak acceleration is the
+    largest of the forward difference at t = 0 (which is how the initial damper kick is
+    seen), the first interior peak if it lies in the window and the acceleration at the
+    window end. Extrema are taken exactly, so this matches the sampled values only
+    where delta is small: the sampled peak displacement is then within delta^2 / 8
+    of the exact one (x'' = -x where the velocity is zero).
+    '''
+    zeta, tau_end, delta = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (zeta, tau_end, delta)))
+    zeta = np.where(np.abs(zeta - 1) < 1e-6, 1 + 1e-6, zeta) # Keep away from the double root
+    under = zeta < 1
+    # x = (exp(r1 t) - exp(r2 t)) / (r1 - r2) with complex roots when underdamped; r1 r2 = 1
+    r2 = -zeta - np.sqrt(zeta.astype(complex) ** 2 - 1)
+    r1 = 1 / r2
+
+    def derivative(t, n):
+        return np.real((r1 ** n * np.exp(r1 * t) - r2 ** n * np.exp(r2 * t)) / (r1 - r2))
+
+    wd = np.sqrt(np.abs(1 - zeta ** 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        theta = np.arctan2(wd, -zeta)
+        tp = np.where(under, np.arctan2(wd, zeta) / wd, np.log(zeta + wd) / wd)
+        tn = np.where(under, tp + np.pi / wd, tp) # Overshoot to the other side
+        tj = np.where(under, ((np.floor(3 * theta / np.pi) + 1) * np.pi - 3 * theta) / wd, 3 * np.log(zeta + wd) / wd)
+    times = [np.minimum(tp, tau_end), np.minimum(tn, tau_end), tau_end]
+    values = [np.zeros(zeta.shape)] + [derivative(t, 0) for t in times]
+    X = np.max(values, axis=0) - np.min(values, axis=0)
+    kick = np.abs(derivative(delta, 1) - 1) / delta
+    interior = np.where(tj <= tau_end, np.abs(derivative(np.minimum(tj, tau_end), 2)), 0.0)
+    end = np.abs(derivative(tau_end, 2)) # Still rising when the window closes
+    return X, np.maximum(kick, np.maximum(interior, end))
+
+
+@functools.lru_cache(maxsize=None)
+def table():
+    '''Master curve table over zeta (built once per process). Returns zeta, X, A, X*A.'''
+    zeta = np.concatenate([np.linspace(0, ZETA_LINEAR, TABLE_POINTS), np.geomspace(ZETA_LINEAR, ZETA_MAX, TAIL_POINTS)[1:]])
+    X, A = peak_functions(zeta)
+    return zeta, X, A, X * A
+
+
+def lookup(zeta):
+    '''X(zeta) and A(zeta) interpolated from the table, or exact beyond ZETA_MAX.'''
+    zeta_t, X_t, A_t, _ = table()
+    zeta = np.asarray(zeta, dtype=float)
+    X = np.interp(zeta, zeta_t, X_t)
+    A = np.interp(zeta, zeta_t, A_t)
+    outside = zeta > ZETA_MAX
+    if np.any(outside):
+        # np.interp would clamp to the last row; X -> 0 and A -> 2 zeta there
+        X_out, A_out = peak_functions(zeta[outside])
+        X, A = np.atleast_1d(X), np.atleast_1d(A)
+        X[np.atleast_1d(outside)] = X_out
+        A[np.atleast_1d(outside)] = A_out
+        X, A = X.reshape(zeta.shape), A.reshape(zeta.shape)
+    return X, A
+
+
+def peak_response(m_capsule, c, k, impact_velocity):
+    '''Total stroke (m) and peak g force of the SMD, from the master curves.'''
+    wn = np.sqrt(k / m_capsule)
+    zeta = c / (2 * np.sqrt(k * m_capsule))
+    v0 = np.abs(impact_velocity)
+    X, A = lookup(zeta)
+    stroke = v0 / wn * X
+    peak_g = v0 * wn * A / g
+    return stroke, peak_g
+
+
+def feasible_kc(m_capsule, impact_velocity, max_stroke, max_g):
+    '''
+    All (k, c) designs with stroke <= max_stroke (m) and peak g <= max_g.
+
+    For every tabulated zeta where a design exists the natural frequency must lie
+    between v0 X / max_stroke (stroke limit) and max_g g / (v0 A) (g limit). Returns a
+    dictionary of arrays: zeta and the matching k_min/k_max and c_min/c_max. The
+    arrays are empty if the limits can't both be met.
+    '''
+    zeta, X, A, P = table()
+    v0 = abs(impact_velocity)
+    ok = P <= max_stroke * max_g * g / v0 ** 2
+    wn_min = v0 * X[ok] / max_stroke
+    wn_max = max_g * g / (v0 * A[ok])
+    return {
+        'zeta': zeta[ok],
+        'k_min': m_capsule * wn_min ** 2,
+        'k_max': m_capsule * wn_max ** 2,
+        'c_min': 2 * zeta[ok] * m_capsule * wn_min,
+        'c_max': 2 * zeta[ok] * m_capsule * wn_max,
+    }
+
+
+def best_kc(m_capsule, impact_velocity, max_stroke, max_g=None):
+    '''
+    The (k, c) giving the lowest peak g while using exactly the allowed stroke.
+
+    Peak g at full stroke is v0^2 X(zeta) A(zeta) / (max_stroke g), so the best damping
+    ratio is the minimum of X*A (the same for every mass and velocity). This is what
+    main.py's objective aims for with a stroke target. Returns a dictionary with k, c,
+    zeta, stroke, peak_g and, if max_g is given, whether the design meets it.
+    '''
+    zeta, X, A, P = table()
+    i = np.argmin(P)
+    v0 = abs(impact_velocity)
+    wn = v0 * X[i] / max_stroke
+    peak_g = v0 * wn * A[i] / g
+    return {
+        'k': float(m_capsule * wn ** 2),
+        'c': float(2 * zeta[i] * m_capsule * wn),
+        'zeta': float(zeta[i]),
+        'stroke': float(max_stroke),
+        'peak_g': float(peak_g),
+        'feasible': None if max_g is None else bool(peak_g <= max_g),
+    }
@@ -0,0 +1,164 @@
+'''
+Incremental evaluation of the main.py design workflow.
+
+main.py runs descent -> impact velocity -> SMD -> unit conversion -> metrics -> plots
+top to bottom. Here every step is a stage with declared inputs (settings and other
+stages). A stage result is memoized under a hash of its input values and only
+recomputed when one of them changes, and a stage whose recomputed result is equal
+to the previous one doesn't invalidate anything downstream. With k, c and thrust
+given, changing mass_capsule_lb or k therefore only re-runs the SMD and what follows
+it (the optimum stage is re-checked, but returns None without optimizing). Left as
+None they come from design.optimize, which depends on every setting, so any setting
+change re-runs the optimization first. Changing label_fontsize only re-renders the
+figure.
+
+Example:
+    p = design_pipeline(k=50, c=5, thrust=20, report_path='design.png')
+    p.get('figure')
+    p.set(k=120)           # next get('figure') re-runs smd, imperial, metrics, figure
+    p.set(label_fontsize=9) # next get('figure') only re-runs figure
+'''
+from cache import make_key
+
+
+class Pipeline:
+    '''Named inputs plus stages that are recomputed only when their inputs change.'''
+
+    def __init__(self, **inputs):
+        self.inputs = dict(inputs)
+        self.stages = {} # name -> (function, input names, stage names)
+        self.memo = {} # name -> (key of the inputs it was computed from, value, fingerprint of value)
+        self.runs = {} # name -> number of times the stage has been computed
+
+    def stage(self, name, inputs=(), stages=()):
+        '''Decorator registering func(**inputs_and_stage_results) as a stage.'''
+        def register(func):
+            self.stages[name] = (func, tuple(inputs), tuple(stages))
+            self.runs[name] = 0
+            return func
+        return register
+
+    def set(self, **inputs):
+        unknown = set(inputs) - set(self.inputs)
+        if unknown:
+            raise ValueError(f"Unknown input(s): {', '.join(sorted(unknown))}")
+        self.inputs.update(inputs)
+
+    def _resolve(self, name):
+        '''Bring a stage up to date. Returns (value, fingerprint).'''
+        func, input_names, stage_names = self.stages[name]
+        upstream = {stage: self._resolve(stage) for stage in stage_names}
+        values = {key: self.inputs[key] for key in input_names}
+        key = make_key(name, [], {**values, **{stage: fp for stage, (_, fp) in upstream.items()}}, '')
+        memo = self.memo.get(name)
+        if memo is not None and memo[0] == key:
+            return memo[1], memo[2]
+        value = func(**values, **{stage: v for stage, (v, _) in upstream.items()})
+        self.runs[name] += 1
+        fingerprint = make_key('value', [value], {}, '')
+        self.memo[name] = (key, value, fingerprint)
+        return value, fingerprint
+
+    def get(self, name):
+        '''Value of a stage, recomputing only the stages whose inputs changed.'''
+        return self._resolve(name)[0]
+
+    def invalidate(self, name=None):
+        '''Forget one memoized stage (or all of them).'''
+        if name is None:
+            self.memo.clear()
+        else:
+            self.memo.pop(name, None)
+
+
+def design_pipeline(**overrides):
+    '''
+    The main.py workflow as a Pipeline.
+
+    Inputs are design.DEFAULT_SETTINGS plus k, c and thrust (None means take them from
+    design.optimize, re-run whenever any setting changes), label_fontsize and
+    report_path (file the figure stage writes).
+    Stages: needs_optimum, optimum, params, thrust, kc, descent, impact_velocity, smd,
+    imperial, metrics, figure.
+    '''
+    import numpy as np
+
+    import design
+    from func_def import simulate_descent
+
+    settings_names = [name for name in design.DEFAULT_SETTINGS]
+    inputs = {**design.DEFAULT_SETTINGS, 'k': None, 'c': None, 'thrust': None, 'label_fontsize': 13, 'report_path': 'design.png'}
+    p = Pipeline(**inputs)
+    p.set(**overrides)
+    descent_names = ['deployment_height_ft', 'initial_deployment_velocity_fts', 'mass_payload_lb', 'drag_coefficient', 'area_in', 'simulation_duration_d']
+    smd_names = ['mass_capsule_lb', 'initial_displacement_in', 'simulation_duration_smd', 'max_displacement_in', 'bumper_stiffness', 'bumper_damping']
+    summary_names = ['max_displacement_in', 'deployment_height_ft', 'initial_deployment_velocity_fts', 'mass_payload_lb', 'mass_capsule_lb']
+
+    @p.stage('needs_optimum', inputs=['k', 'c', 'thrust'])
+    def needs_optimum_stage(k, c, thrust):
+        return k is None or c is None or thrust is None
+
+    @p.stage('optimum', inputs=settings_names, stages=['needs_optimum'])
+    def optimum_stage(needs_optimum, **settings):
+        return design.optimize(design.make_settings(settings)) if needs_optimum else None
+
+    @p.stage('params', inputs=['k', 'c', 'thrust'], stages=['optimum'])
+    def params_stage(k, c, thrust, optimum):
+        # Given values win over the optimized ones
+        return {
+            'k': optimum['k'] if k is None else k,
+            'c': optimum['c'] if c is None else c,
+            'thrust': optimum['thrust'] if thrust is None else thrust,
+        }
+
+    @p.stage('thrust', stages=['params'])
+    def thrust_stage(params):
+        return params['thrust']
+
+    @p.stage('kc', stages=['params'])
+    def kc_stage(params):
+        return params['k'], params['c']
+
+    @p.stage('descent', inputs=descent_names, stages=['thrust'])
+    def descent_stage(thrust, **settings):
+        si = design.to_si(settings)
+        height, velocity, _ = simulate_descent(si['initial_deployment_velocity_ms'], si['deployment_height_m'], design.rho, si['mass_payload_kg'], si['drag_coefficient'], si['area_m'], thrust, si['t_d'])
+        return {'height': height, 'velocity': velocity}
+
+    @p.stage('impact_velocity', stages=['descent'])
+    def impact_velocity_stage(descent):
+        return float(descent['velocity'][(np.abs(descent['height'])).argmin()])
+
+    @p.stage('smd', inputs=smd_names, stages=['kc', 'impact_velocity'])
+    def smd_stage(kc, impact_velocity, **settings):
+        si = design.to_si(settings)
+        displacement, velocity, acceleration = design.smd_response(si, kc[0], kc[1], impact_velocity)
+        return {'t': si['t_smd'], 'displacement': displacement, 'velocity': velocity, 'acceleration': acceleration}
+
+    @p.stage('imperial', stages=['descent', 'smd'])
+    def imperial_stage(descent, smd):
+        return {
+            't_smd': smd['t'],
+            'displacement': smd['displacement'] * 39.3701,
+            'velocity': smd['velocity'] * 3.28084,
+            'g_force': smd['acceleration'] * 0.101972,
+            'height': descent['height'] * 3.28084,
+            'velocity_descent': descent['velocity'] * 3.28084,
+        }
+
+    @p.stage('metrics', stages=['imperial', 'impact_velocity'])
+    def metrics_stage(imperial, impact_velocity):
+        displacement = imperial['displacement']
+        return {
+            'max_g_force': float(imperial['g_force'][np.argmax(np.abs(imperial['g_force']))]),
+            'max_displacement_in': float(np.max(displacement)),
+            'total_displacement_in': float(np.max(displacement) - np.min(displacement)),
+            'impact_velocity_fts': impact_velocity * 3.28084,
+        }
+
+    @p.stage('figure', inputs=summary_names + ['label_fontsize', 'report_path'], stages=['params', 'imperial'])
+    def figure_stage(params, imperial, label_fontsize, report_path, **settings):
+        import report
+        return report.draw_design_figure(settings, params, imperial['t_smd'], imperial['displacement'], imperial['g_force'], imperial['height'], imperial['velocity_descent'], report_path, label_fontsize)
+
+    return p
@@ -0,0 +1,151 @@
+'''
+Compact storage for large numbers of evaluated designs.
+
+A design record is one row of a NumPy structured array: the inputs in SI units, the
+derived impact velocity, peak g, stroke and objective, feasibility flags and solver
+stats. With float32 storage a record is 57 bytes, so a million designs take about
+57 MB. Filtering and sorting are plain vectorized NumPy operations, e.g.
+
+    ok = recs[(recs['flags'] & FEASIBLE) != 0]
+    ok[np.argsort(ok['peak_g'])][:10]
+
+and save()/load() write and memory-map .npy files without copying.
+'''
+import numpy as np
+
+import design
+import tradecurves
+
+# Bits of the 'flags' field
+FEASIBLE = 1
+G_LIMIT_EXCEEDED = 2
+STROKE_LIMIT_EXCEEDED = 4
+SOLVER_FAILED = 8
+HIGH_FIDELITY = 16 # Metrics come from the odeint path rather than the closed-form models
+
+INPUT_FIELDS = ['deployment_height_m', 'deployment_velocity_ms', 'mass_payload_kg', 'mass_capsule_kg', 'drag_coefficient', 'area_m2', 'k', 'c', 'thrust']
+RESULT_FIELDS = ['impact_velocity_ms', 'peak_g', 'stroke_m', 'objective']
+
+
+def design_dtype(precision='float32'):
+    '''Structured dtype of a design record (float fields in the given precision).'''
+    fields = [(name, precision) for name in INPUT_FIELDS + RESULT_FIELDS]
+    return np.dtype(fields + [('flags', 'u1'), ('nfev', 'u4')])
+
+
+def empty(n, precision='float32'):
+    records = np.zeros(n, dtype=design_dtype(precision))
+    for name in RESULT_FIELDS:
+        records[name] = np.nan
+    return records
+
+
+def flags_for(peak_g, stroke_m, max_stroke_m, max_g=None, high_fidelity=False):
+    '''Flag bits for arrays of peak g and stroke.'''
+    peak_g = np.asarray(peak_g, dtype=float)
+    stroke_m = np.asarray(stroke_m, dtype=float)
+    failed = ~(np.isfinite(peak_g) & np.isfinite(stroke_m))
+    with np.errstate(invalid='ignore'):
+        over_g = peak_g > max_g if max_g is not None else np.zeros(peak_g.shape, dtype=bool)
+        over_stroke = stroke_m > max_stroke_m
+    flags = np.where(over_g, G_LIMIT_EXCEEDED, 0) | np.where(over_stroke, STROKE_LIMIT_EXCEEDED, 0) | np.where(failed, SOLVER_FAILED, 0)
+    flags |= np.where(~(over_g | over_stroke | failed), FEASIBLE, 0)
+    if high_fidelity:
+        flags |= HIGH_FIDELITY
+    return flags.astype('u1')
+
+
+def _fill_inputs(records, si):
+    records['deployment_height_m'] = si['deployment_height_m']
+    records['deployment_velocity_ms'] = si['initial_deployment_velocity_ms']
+    records['mass_payload_kg'] = si['mass_payload_kg']
+    records['mass_capsule_kg'] = si['mass_capsule_kg']
+    records['drag_coefficient'] = si['drag_coefficient']
+    records['area_m2'] = si['area_m']
+
+
+def from_screening(result, settings=None, max_g=None, precision='float32'):
+    '''Records for every candidate of a screening.screen() result.'''
+    si = design.to_si(settings)
+    candidates = result['candidates']
+    records = empty(len(candidates), precision)
+    _fill_inputs(records, si)
+    records['k'], records['c'], records['thrust'] = candidates.T
+    records['impact_velocity_ms'] = tradecurves.impact_state(si['drag_coefficient'], si['mass_payload_kg'], si['area_m'], si['deployment_height_m'], si['initial_deployment_velocity_ms'], candidates[:, 2])['impact_velocity']
+    promoted = result['promoted']
+    # High-fidelity values where they exist, cheap ones otherwise (flags of skipped
+    # candidates are then those of the cheap model)
+    peak_g = np.where(promoted, result['g_force'], result['cheap_g_force'])
+    stroke_in = np.where(promoted, result['displacement_in'], result['cheap_displacement_in'])
+    records['peak_g'] = peak_g
+    records['stroke_m'] = stroke_in / 39.3701
+    records['objective'] = np.where(promoted, result['objective'], result['cheap_objective'])
+    records['flags'] = flags_for(peak_g, stroke_in / 39.3701, si['max_displacement_m'], max_g)
+    records['flags'][promoted] |= HIGH_FIDELITY
+    return records
+
+
+def from_optimizations(results, settings_list, max_g=None, precision='float32'):
+    '''Records for a list of design.optimize() results and the settings they were run with.'''
+    records = empty(len(results), precision)
+    for i, (result, settings) in enumerate(zip(results, settings_list)):
+        si = design.to_si(settings)
+        _fill_inputs(records[i:i + 1], si)
+        records[i]['k'], records[i]['c'], records[i]['thrust'] = result['k'], result['c'], result['thrust']
+        records[i]['impact_velocity_ms'] = result['impact_velocity_fts'] * 0.3048
+        records[i]['peak_g'] = result['max_g_force']
+        records[i]['stroke_m'] = result['total_displacement_in'] * 0.0254
+        records[i]['objective'] = result['objective']
+        records[i]['nfev'] = result['nfev']
+        records[i]['flags'] = flags_for(result['max_g_force'], result['total_displacement_in'] * 0.0254, si['max_displacement_m'], max_g, high_fidelity=True)
+        if not result['success']:
+            records[i]['flags'] |= SOLVER_FAILED
+    return records
+
+
+def feasible(records):
+    return records[(records['flags'] & FEASIBLE) != 0]
+
+
+def best(records, field='objective', n=10):
+    '''The n records with the lowest value of field (NaNs last).'''
+    if n >= len(records):
+        return records[np.argsort(records[field], kind='stable')]
+    index = np.argpartition(records[field], n)[:n]
+    return records[index[np.argsort(records[field][index], kind='stable')]]
+
+
+def save(path, records):
+    np.save(path, records, allow_pickle=False)
+
+
+def load(path, mmap=True):
+    '''Load records, memory-mapped (no copy, read-only) by default.'''
+    return np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+class RecordBuffer:
+    '''Growable record store for appending designs one at a time or in blocks.'''
+    __slots__ = ('data', 'size')
+
+    def __init__(self, capacity=1024, precision='float32'):
+        self.data = empty(capacity, precision)
+        self.size = 0
+
+    def append(self, block):
+        '''Append a record array (or a single record) to the buffer.'''
+        block = np.atleast_1d(block)
+        needed = self.size + len(block)
+        if needed > len(self.data):
+            grown = empty(max(needed, 2 * len(self.data)), self.data.dtype[0].name)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = block
+        self.size = needed
+
+    def records(self):
+        '''View of the filled part of the buffer.'''
+        return self.data[:self.size]
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,190 @@
+'''
+Headless figure rendering for design reports.
+
+Figures are drawn on Agg canvases outside pyplot (subplots()), so importing this
+module leaves the pyplot backend of the process alone, and written straight to disk
+(PNG, SVG or PDF, picked from the file extension). Long trajectories are
+decimated before plotting and large grids are drawn as raster images, so
+sweep-sized data renders quickly. render_figures() renders many figures in
+parallel on a process pool.
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+MAX_LINE_POINTS = 4000 # Points drawn per line after decimation
+MAX_SCATTER_POINTS = 50000 # Above this a point cloud is drawn as a 2-D histogram image
+
+
+def decimate(x, y, max_points=MAX_LINE_POINTS):
+    '''
+    Shape preserving downsampling of a line for plotting.
+
+    The samples are split into equal buckets and the minimum and maximum of every
+    bucket are kept (in their original order), so peaks and troughs survive exactly.
+    The first and last samples are always kept. Returns the decimated x and y arrays.
+    '''
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    buckets = max(1, (max_points - 2) // 2)
+    size = -(-(n - 2) // buckets) # Samples per bucket, rounded up
+    inner = np.full(buckets * size, np.nan)
+    inner[:n - 2] = y[1:n - 1]
+    inner = inner.reshape(buckets, size)
+    valid = ~np.all(np.isnan(inner), axis=1)
+    offsets = 1 + np.arange(buckets)[valid] * size
+    i_min = offsets + np.nanargmin(inner[valid], axis=1)
+    i_max = offsets + np.nanargmax(inner[valid], axis=1)
+    keep = np.unique(np.concatenate([[0, n - 1], i_min, i_max]))
+    return x[keep], y[keep]
+
+
+def subplots(nrows=1, ncols=1, figsize=None, **kwargs):
+    '''Like plt.subplots(), but the figure has its own Agg canvas and is not tracked by pyplot.'''
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(nrows, ncols, **kwargs)
+
+
+def plot_line(ax, x, y, max_points=MAX_LINE_POINTS, **kwargs):
+    '''ax.plot() of a decimated copy of the line.'''
+    return ax.plot(*decimate(x, y, max_points), **kwargs)
+
+
+def plot_grid(ax, values, x_values, y_values, **kwargs):
+    '''Draw a 2-D grid (rows follow y_values) as a single raster image instead of cells.'''
+    kwargs.setdefault('aspect', 'auto')
+    kwargs.setdefault('origin', 'lower')
+    kwargs.setdefault('interpolation', 'nearest')
+    extent = [np.min(x_values), np.max(x_values), np.min(y_values), np.max(y_values)]
+    return ax.imshow(values, extent=extent, **kwargs)
+
+
+def plot_cloud(ax, x, y, bins=400, max_points=MAX_SCATTER_POINTS, **kwargs):
+    '''Scatter plot for small clouds, 2-D histogram image for large (e.g. Monte Carlo) ones.'''
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) <= max_points:
+        return ax.scatter(x, y, s=kwargs.pop('s', 4), **kwargs)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    counts = np.ma.masked_equal(counts.T, 0)
+    kwargs.setdefault('cmap', 'viridis')
+    return plot_grid(ax, counts, x_edges, y_edges, **kwargs)
+
+
+def save_figure(fig, path, dpi=150):
+    '''Write a figure from subplots() to disk (format from the extension).'''
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def design_figure(settings, result, path, label_fontsize=13):
+    '''
+    Render the main.py results figure for an optimized design to a file.
+
+    result needs the optimized 'k', 'c' and 'thrust' (as returned by design.optimize).
+    '''
+    import design
+    from func_def import simulate_descent
+
+    s = design.make_settings(settings)
+    si = design.to_si(s)
+    height, velocity_descent, _ = simulate_descent(si['initial_deployment_velocity_ms'], si['deployment_height_m'], design.rho, si['mass_payload_kg'], si['drag_coefficient'], si['area_m'], result['thrust'], si['t_d'])
+    zero_height_index = (np.abs(height)).argmin()
+    displacement, _, acceleration = design.smd_response(si, result['k'], result['c'], velocity_descent[zero_height_index])
+
+    # Convert units back to imperial
+    return draw_design_figure(s, result, si['t_smd'], displacement * 39.3701, acceleration * 0.101972, height * 3.28084, velocity_descent * 3.28084, path, label_fontsize)
+
+
+def draw_design_figure(settings, result, t_smd, displacement_result, G_Force_result, height_result, velocity_descent_result, path, label_fontsize=13):
+    '''Draw the main.py results figure from already simulated (imperial unit) arrays.'''
+    s = settings
+    zero_height_index = (np.abs(height_result)).argmin()
+    i_max_d = np.argmax(displacement_result)
+    i_min_d = np.argmin(displacement_result)
+    i_max_g = np.argmax(np.abs(G_Force_result))
+    velocity_at_zero_height = velocity_descent_result[zero_height_index]
+
+    fig, ax = subplots(2, 2, figsize=(10, 8))
+
+    plot_line(ax[0, 0], t_smd, displacement_result, label='Displacement')
+    ax[0, 0].scatter([t_smd[i_max_d], t_smd[i_min_d]], [displacement_result[i_max_d], displacement_result[i_min_d]], color=['red', 'blue'])
+    ax[0, 0].text(t_smd[i_max_d], displacement_result[i_max_d], f'  {displacement_result[i_max_d]:.2f} in', fontsize=label_fontsize)
+    ax[0, 0].text(t_smd[i_min_d], displacement_result[i_min_d], f'  {displacement_result[i_min_d]:.2f} in', fontsize=label_fontsize)
+    ax[0, 0].set_xlabel('Time (s)')
+    ax[0, 0].set_ylabel('Displacement (in)')
+    ax[0, 0].set_title('Displacement vs. Time')
+    ax[0, 0].grid(True)
+    ax[0, 0].legend()
+
+    plot_line(ax[1, 0], t_smd, G_Force_result, label='G Force')
+    ax[1, 0].scatter(t_smd[i_max_g], G_Force_result[i_max_g], color='red')
+    ax[1, 0].text(t_smd[i_max_g], G_Force_result[i_max_g], f'  {G_Force_result[i_max_g]:.2f} Gs', fontsize=label_fontsize)
+    ax[1, 0].set_xlabel('Time (s)')
+    ax[1, 0].set_ylabel('G Force')
+    ax[1, 0].set_title('G Force vs. Time')
+    ax[1, 0].grid(True)
+    ax[1, 0].legend()
+
+    plot_line(ax[0, 1], velocity_descent_result, height_result)
+    ax[0, 1].scatter(velocity_at_zero_height, height_result[zero_height_index], color='red')
+    ax[0, 1].text(velocity_at_zero_height, height_result[zero_height_index] + 5, f'  {velocity_at_zero_height:.2f} ft/s', fontsize=label_fontsize)
+    ax[0, 1].axhline(y=s['deployment_height_ft'], color='b', linestyle='--', label=f"Initial Height: {s['deployment_height_ft']} ft")
+    ax[0, 1].axhline(y=0, color='darkgreen', linestyle='-', linewidth=2, label='Ground Level')
+    ax[0, 1].set_xlabel('Velocity (ft/s)')
+    ax[0, 1].set_ylabel('Height (ft)')
+    ax[0, 1].set_title('Velocity vs. Height During Descent')
+    ax[0, 1].set_ylim(bottom=-20)
+    ax[0, 1].grid(True)
+    ax[0, 1].legend()
+
+    # All the summary text goes into one text object instead of a text call per line
+    ax[1, 1].axis('off')
+    summary = '\n'.join([
+        'Simulation was ran with following values:',
+        f"    Desired Displacement: {s['max_displacement_in']:.2f} in",
+        f"    Deployment Height:  {s['deployment_height_ft']:.2f} ft",
+        f"    Initial Velocity: {s['initial_deployment_velocity_fts']:.2f} ft/s",
+        f"    Total Payload Mass: {s['mass_payload_lb']:.2f} lbs",
+        f"    STEMnaut Capsule Mass: {s['mass_capsule_lb']:.2f} lbs",
+        '',
+        'Optimized Results:',
+        f"    Optimal Spring Constant (k): {result['k']:.2f} N/m",
+        f"    Optimal Damping Coefficient (c): {result['c']:.2f} Ns/m",
+        f"    Optimal Thrust: {result['thrust']:.2f} N",
+    ])
+    ax[1, 1].text(0, 0.9, summary, va='top', fontsize=11, transform=ax[1, 1].transAxes)
+
+    fig.tight_layout()
+    return save_figure(fig, path)
+
+
+def _render(job):
+    func, args, kwargs = job
+    return func(*args, **kwargs)
+
+
+def render_figures(jobs, workers=None):
+    '''
+    Render many figures in parallel.
+
+    jobs is a list of (function, args) or (function, args, kwargs) tuples. Each
+    function must be importable (module level) and save its own figure, e.g.
+    (design_figure, (settings, result, 'out/design.png')). Returns the list of
+    return values in the same order as jobs.
+    '''
+    jobs = [job if len(job) == 3 else (job[0], job[1], {}) for job in jobs]
+    if workers == 1 or len(jobs) <= 1:
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render, jobs))
@@ -0,0 +1,115 @@
+'''
+Robust design optimization over uncertain inputs.
+
+main.py optimizes for a single nominal Cd, mass and deployment state. Here the same
+k, c and thrust are scored over a fixed set of sampled scenarios instead, and the
+objective uses a statistic of the peak g and stroke over those scenarios (mean + kappa
+standard deviations, or a high quantile). The samples are drawn once from a seeded
+generator and reused for every objective call (common random numbers), which keeps
+the objective smooth enough for minimize.
+
+Every objective call scores all scenarios in one vectorized evaluation: the impact
+velocity comes from the closed-form descent solution (tradecurves) and the SMD peaks
+from the master curves (mastercurves), so no ODE is solved inside the optimizer. The
+master curves are those of the free SMD: an end stop bumper (bumper_stiffness) is not
+modelled here.
+'''
+import numpy as np
+from scipy.optimize import minimize
+
+import design
+import mastercurves
+import tradecurves
+
+# Default 1-sigma relative scatter of the uncertain inputs
+DEFAULT_SPREAD = {
+    'drag_coefficient': 0.10,
+    'mass_payload_lb': 0.03,
+    'mass_capsule_lb': 0.03,
+    'deployment_height_ft': 0.05,
+    'initial_deployment_velocity_fts': 0.10,
+    'thrust': 0.05, # Scatter of the delivered thrust around the commanded value
+}
+
+
+def sample_scenarios(settings=None, n_samples=500, seed=0, spread=None):
+    '''
+    Draw n_samples scenarios around the nominal settings.
+
+    Each uncertain input is multiplied by a normal factor 1 + spread * N(0, 1) (kept
+    positive). spread overrides entries of DEFAULT_SPREAD; set an entry to 0 to keep
+    that input at its nominal value. Returns a dictionary of SI arrays plus the
+    'thrust_factor' applied to the commanded thrust.
+    '''
+    s = design.make_settings(settings)
+    spread = {**DEFAULT_SPREAD, **(spread or {})}
+    unknown = set(spread) - set(DEFAULT_SPREAD)
+    if unknown:
+        raise ValueError(f"Unknown uncertain input(s): {', '.join(sorted(unknown))}")
+    rng = np.random.default_rng(seed)
+    factors = {name: np.clip(1 + sigma * rng.standard_normal(n_samples), 0.01, None) for name, sigma in sorted(spread.items())}
+    si = design.to_si(s)
+    return {
+        'drag_coefficient': si['drag_coefficient'] * factors['drag_coefficient'],
+        'mass_payload_kg': si['mass_payload_kg'] * factors['mass_payload_lb'],
+        'mass_capsule_kg': si['mass_capsule_kg'] * factors['mass_capsule_lb'],
+        'deployment_height_m': si['deployment_height_m'] * factors['deployment_height_ft'],
+        'initial_deployment_velocity_ms': si['initial_deployment_velocity_ms'] * factors['initial_deployment_velocity_fts'],
+        'thrust_factor': factors['thrust'],
+    }
+
+
+def scenario_response(params, si, scenarios):
+    '''Peak g force and total stroke (inches) of one design in every scenario (free SMD, no end stop).'''
+    k, c, thrust = params
+    impact = tradecurves.impact_state(scenarios['drag_coefficient'], scenarios['mass_payload_kg'], si['area_m'], scenarios['deployment_height_m'], scenarios['initial_deployment_velocity_ms'], thrust * scenarios['thrust_factor'])
+    # A payload the thrust stops above the ground is counted as a zero velocity landing
+    v_impact = np.nan_to_num(impact['impact_velocity'], nan=0.0)
+    stroke_m, peak_g = mastercurves.peak_response(scenarios['mass_capsule_kg'], c, k, v_impact)
+    return peak_g, stroke_m * 39.3701
+
+
+def statistic(values, kind='mean_std', kappa=2.0, quantile=0.99):
+    '''mean + kappa * std ('mean_std') or the given quantile ('quantile') of values.'''
+    if kind == 'mean_std':
+        return np.mean(values) + kappa * np.std(values)
+    if kind == 'quantile':
+        return np.quantile(values, quantile)
+    raise ValueError(f"Unknown statistic: {kind}")
+
+
+def robust_objective(params, si, scenarios, kind='mean_std', kappa=2.0, quantile=0.99):
+    '''main.py's objective with the peak g and stroke replaced by their statistic over the scenarios.'''
+    peak_g, stroke_in = scenario_response(params, si, scenarios)
+    robust_g = statistic(peak_g, kind, kappa, quantile)
+    robust_stroke = statistic(stroke_in, kind, kappa, quantile)
+    return np.abs(si['max_displacement_in'] - robust_stroke) + si['weight'] * robust_g
+
+
+def optimize_robust(settings=None, n_samples=500, seed=0, spread=None, kind='mean_std', kappa=2.0, quantile=0.99):
+    '''
+    Optimize k, c and thrust for the robust objective.
+
+    kind is 'mean_std' (mean + kappa sigma) or 'quantile' (the given quantile). Returns
+    the optimized parameters along with the robust, mean and worst-case peak g and
+    stroke over the scenarios.
+    '''
+    si = design.to_si(settings)
+    scenarios = sample_scenarios(settings, n_samples, seed, spread)
+    result = minimize(robust_objective, si['initial_guess'], args=(si, scenarios, kind, kappa, quantile), bounds=si['bounds'])
+    peak_g, stroke_in = scenario_response(result.x, si, scenarios)
+    k, c, thrust = result.x
+    return {
+        'k': float(k),
+        'c': float(c),
+        'thrust': float(thrust),
+        'robust_g_force': float(statistic(peak_g, kind, kappa, quantile)),
+        'robust_displacement_in': float(statistic(stroke_in, kind, kappa, quantile)),
+        'mean_g_force': float(np.mean(peak_g)),
+        'max_g_force': float(np.max(peak_g)),
+        'mean_displacement_in': float(np.mean(stroke_in)),
+        'max_displacement_in': float(np.max(stroke_in)),
+        'objective': float(result.fun),
+        'success': bool(result.success),
+        'nfev': int(result.nfev),
+    }
@@ -0,0 +1,123 @@
+'''
+Multi-fidelity screening of large design sweeps.
+
+Every candidate (k, c, thrust) is first scored with the cheap model: the closed-form
+impact velocity (tradecurves) and the SMD master curves as main.py's odeint path
+measures them (mastercurves.sampled_peak_functions: same time window, forward
+difference kick at t = 0), which costs microseconds per candidate for the whole sweep
+at once. Only candidates that could still matter after allowing for the difference
+between the two models (CHEAP_ERROR) are promoted and re-evaluated with the
+high-fidelity odeint path:
+
+ - candidates that may meet the stroke (and g) limits, and
+ - whose objective may be within that error of the best surely-feasible candidate.
+
+CHEAP_ERROR only holds where the sampling resolves the response, wn dt <=
+MAX_SAMPLE_STEP, and for the free SMD: the master curves don't model the end stop, so
+with a bumper (bumper_stiffness) every candidate is promoted, as is every candidate
+outside that range. The rest are clearly infeasible or clearly worse and are skipped.
+'''
+import numpy as np
+
+import design
+import mastercurves
+import tradecurves
+
+# Bound on the relative difference in peak g and stroke between the cheap model and
+# the odeint path for wn dt <= MAX_SAMPLE_STEP. What is left there is the sampling of
+# the extrema (at most MAX_SAMPLE_STEP^2 / 8 = 0.5% for the stroke) and np.gradient
+# at interior peaks; the largest differences seen over 2500 random designs across the
+# optimizer bounds were 0.3% (stroke) and 0.8% (peak g).
+CHEAP_ERROR = 0.02
+MAX_SAMPLE_STEP = 0.2 # Largest wn dt (radians of the natural frequency per sample) the bound holds for
+
+
+def candidate_grid(k_values, c_values, thrust_values):
+    '''All combinations of the given k, c and thrust values as an (n, 3) array.'''
+    k, c, thrust = np.meshgrid(k_values, c_values, thrust_values, indexing='ij')
+    return np.column_stack([k.ravel(), c.ravel(), thrust.ravel()])
+
+
+def cheap_metrics(candidates, si):
+    '''
+    Peak g, stroke (inches) and objective of every candidate from the closed-form
+    models, and whether the candidate is in the range where CHEAP_ERROR holds.
+    '''
+    k, c, thrust = np.asarray(candidates, dtype=float).T
+    m = si['mass_capsule_kg']
+    impact = tradecurves.impact_state(si['drag_coefficient'], si['mass_payload_kg'], si['area_m'], si['deployment_height_m'], si['initial_deployment_velocity_ms'], thrust)
+    v_impact = np.nan_to_num(impact['impact_velocity'], nan=0.0)
+    t = si['t_smd']
+    wn = np.sqrt(k / m)
+    zeta = c / (2 * np.sqrt(k * m))
+    X, A = mastercurves.sampled_peak_functions(zeta, wn * t[-1], wn * (t[1] - t[0]))
+    stroke_in = v_impact / wn * X * 39.3701
+    peak_g = v_impact * wn * A / design.g
+    objective = np.abs(si['max_displacement_in'] - stroke_in) + si['weight'] * peak_g
+    validated = (wn * (t[1] - t[0]) <= MAX_SAMPLE_STEP) & (si['bumper_stiffness'] is None)
+    return peak_g, stroke_in, objective, validated
+
+
+def screen(candidates, settings=None, max_g=None, error=CHEAP_ERROR):
+    '''
+    Evaluate a sweep of (k, c, thrust) candidates with cheap screening.
+
+    Feasible means stroke <= max_displacement_in and, if max_g is given, peak g <= max_g.
+    Returns a dictionary with the cheap metrics of all candidates, the 'validated' and
+    'promoted' masks, the high-fidelity metrics (NaN where not promoted), the
+    'feasible' mask (high fidelity), the index of the best feasible candidate ('best',
+    None if there is none) and the counts 'total', 'promoted_count' and
+    'descent_solves'.
+    '''
+    si = design.to_si(settings)
+    candidates = np.asarray(candidates, dtype=float)
+    g_limit = np.inf if max_g is None else max_g
+    stroke_limit = si['max_displacement_in']
+    peak_g, stroke_in, objective, validated = cheap_metrics(candidates, si)
+
+    # Worst-case ranges of the high-fidelity values given the cheap ones
+    objective_bound = error * (stroke_in + si['weight'] * peak_g)
+    maybe_feasible = (peak_g * (1 - error) <= g_limit) & (stroke_in * (1 - error) <= stroke_limit)
+    surely_feasible = validated & (peak_g * (1 + error) <= g_limit) & (stroke_in * (1 + error) <= stroke_limit)
+    best_upper = np.min(objective[surely_feasible] + objective_bound[surely_feasible]) if surely_feasible.any() else np.inf
+    promoted = ~validated | (maybe_feasible & (objective - objective_bound <= best_upper))
+
+    n = len(candidates)
+    hifi_g = np.full(n, np.nan)
+    hifi_stroke = np.full(n, np.nan)
+    hifi_objective = np.full(n, np.nan)
+    impact_velocities = {} # One descent solve per distinct thrust
+    for i in np.flatnonzero(promoted):
+        k, c, thrust = candidates[i]
+        if thrust not in impact_velocities:
+            impact_velocities[thrust] = design.impact_velocity(si, thrust)
+        hifi_g[i], hifi_stroke[i] = design.smd_metrics(si, k, c, impact_velocities[thrust])
+        hifi_objective[i] = np.abs(stroke_limit - hifi_stroke[i]) + si['weight'] * hifi_g[i]
+
+    feasible = promoted & (hifi_g <= g_limit) & (hifi_stroke <= stroke_limit)
+    best = int(np.flatnonzero(feasible)[np.argmin(hifi_objective[feasible])]) if feasible.any() else None
+    return {
+        'candidates': candidates,
+        'cheap_g_force': peak_g,
+        'cheap_displacement_in': stroke_in,
+        'cheap_objective': objective,
+        'validated': validated,
+        'promoted': promoted,
+        'g_force': hifi_g,
+        'displacement_in': hifi_stroke,
+        'objective': hifi_objective,
+        'feasible': feasible,
+        'best': best,
+        'total': n,
+        'promoted_count': int(promoted.sum()),
+        'descent_solves': len(impact_velocities),
+    }
+
+
+def summary(result):
+    '''One line report of a screen() result.'''
+    text = f"{result['total']} candidates, {result['promoted_count']} promoted to high fidelity ({result['descent_solves']} descent solves), {int(result['feasible'].sum())} feasible"
+    if result['best'] is not None:
+        k, c, thrust = result['candidates'][result['best']]
+        text += f"; best k = {k:.2f} N/m, c = {c:.2f} Ns/m, thrust = {thrust:.2f} N (objective {result['objective'][result['best']]:.3f})"
+    return text
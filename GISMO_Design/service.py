@@ -0,0 +1,238 @@
+'''
+Local design evaluation service for interactive tools.
+
+A small asyncio HTTP/JSON server (no extra dependencies) that keeps a pool of worker
+processes with the simulation code already imported, so a request only pays for the
+computation itself. It only listens on localhost.
+
+Endpoints (POST, JSON body, JSON response):
+    /simulate-descent   {"settings": {...}, "thrust": 20}
+    /simulate-smd       {"settings": {...}, "k": 150, "c": 5, "impact_velocity": 16.1}
+                        (impact_velocity in m/s, computed from "thrust" if omitted)
+    /objective          {"settings": {...}, "params": [k, c, thrust]}
+    /optimize           {"settings": {...}, "mode": "coupled" | "decomposed" | "robust"}
+    GET /health
+
+"settings" holds main.py USER SETTINGS overrides (see design.DEFAULT_SETTINGS).
+Identical requests that are in flight at the same time are coalesced into one
+evaluation. A request may name a "channel" (e.g. one per UI slider): a newer request on
+the same channel cancels the older one, which is answered with status 409.
+
+Usage:
+    python service.py --port 8765 --workers 4
+'''
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_PORT = 8765
+
+
+# ---- Work done in the worker processes ----
+
+def _warm_up():
+    # Imports scipy and the model once per worker, before the first real request
+    import design
+    design.objective_function([50, 5, 20], design.to_si({}))
+    return True
+
+
+def simulate_descent_task(body):
+    import design
+    from func_def import simulate_descent
+    si = design.to_si(body.get('settings'))
+    height, velocity, acceleration = simulate_descent(si['initial_deployment_velocity_ms'], si['deployment_height_m'], design.rho, si['mass_payload_kg'], si['drag_coefficient'], si['area_m'], body.get('thrust', 0), si['t_d'])
+    i = np.abs(height).argmin()
+    return {'t': si['t_d'].tolist(), 'height': height.tolist(), 'velocity': velocity.tolist(), 'acceleration': acceleration.tolist(), 'impact_velocity': float(velocity[i])}
+
+
+def simulate_smd_task(body):
+    import design
+    si = design.to_si(body.get('settings'))
+    v_impact = body.get('impact_velocity')
+    if v_impact is None:
+        v_impact = design.impact_velocity(si, body.get('thrust', 0))
+    displacement, velocity, acceleration = design.smd_response(si, body['k'], body['c'], v_impact)
+    return {'t': si['t_smd'].tolist(), 'displacement': displacement.tolist(), 'velocity': velocity.tolist(), 'acceleration': acceleration.tolist(), 'impact_velocity': float(v_impact)}
+
+
+def objective_task(body):
+    import design
+    return {'objective': float(design.objective_function(body['params'], design.to_si(body.get('settings'))))}
+
+
+def optimize_task(body):
+    import design
+    mode = body.get('mode', 'coupled')
+    if mode == 'coupled':
+        return design.optimize(design.make_settings(body.get('settings')))
+    if mode == 'decomposed':
+        return design.optimize_decomposed(design.make_settings(body.get('settings')), body.get('target_impact_velocity_fts'), body.get('thrust'))
+    if mode == 'robust':
+        import robust
+        return robust.optimize_robust(body.get('settings'), **body.get('robust', {}))
+    raise ValueError(f"Unknown optimize mode: {mode}")
+
+
+TASKS = {
+    '/simulate-descent': simulate_descent_task,
+    '/simulate-smd': simulate_smd_task,
+    '/objective': objective_task,
+    '/optimize': optimize_task,
+}
+
+
+# ---- Server ----
+
+class Superseded(Exception):
+    pass
+
+
+class DesignService:
+    '''Dispatches requests to the warm worker pool with coalescing and per-channel cancellation.'''
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.in_flight = {} # Canonical request -> [asyncio future of its result, number of waiters]
+        self.channels = {} # Channel name -> task handling its latest request
+        self.evaluations = 0
+        self.coalesced = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm_up) for _ in range(self.workers)))
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def evaluate(self, path, body):
+        '''Run a task in the pool, sharing the result with identical in-flight requests.'''
+        key = path + json.dumps({k: v for k, v in body.items() if k != 'channel'}, sort_keys=True)
+        entry = self.in_flight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            entry = [loop.run_in_executor(self.pool, TASKS[path], body), 0]
+            self.evaluations += 1
+            self.in_flight[key] = entry
+            entry[0].add_done_callback(lambda _: self.in_flight.pop(key, None))
+        future = entry[0]
+        entry[1] += 1
+        try:
+            # Shielded so cancelling one waiting request doesn't cancel it for the others
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Nobody wants the result any more: drop it from the pool if it hasn't started
+            if entry[1] == 1:
+                future.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    async def handle(self, path, body):
+        channel = body.get('channel')
+        if channel is None:
+            return await self.evaluate(path, body)
+        previous = self.channels.get(channel)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task = asyncio.ensure_future(self.evaluate(path, body))
+        self.channels[channel] = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled():
+                raise Superseded(f"Superseded by a newer request on channel {channel!r}")
+            raise
+        finally:
+            if self.channels.get(channel) is task:
+                del self.channels[channel]
+
+    async def respond(self, method, path, raw_body):
+        '''Return (status, JSON-serializable response) for one HTTP request.'''
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'workers': self.workers, 'evaluations': self.evaluations, 'coalesced': self.coalesced}
+        if method != 'POST' or path not in TASKS:
+            return 404, {'error': f"No endpoint {method} {path}"}
+        try:
+            body = json.loads(raw_body or b'{}')
+        except json.JSONDecodeError as e:
+            return 400, {'error': f"Invalid JSON: {e}"}
+        if not isinstance(body, dict):
+            return 400, {'error': f"The request body must be a JSON object, not {type(body).__name__}"}
+        try:
+            return 200, await self.handle(path, body)
+        except Superseded as e:
+            return 409, {'error': str(e)}
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {'error': f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            # Solver failures, a broken worker pool, ...: still answer the request
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                raw_body = await reader.readexactly(int(headers.get('content-length', 0)))
+                try:
+                    status, response = await self.respond(method, path, raw_body)
+                    payload = json.dumps(response).encode()
+                except Exception as e:
+                    # Never drop a connection without a reply
+                    status, payload = 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 409: 'Conflict', 500: 'Internal Server Error'}
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, workers=None, ready=None):
+    '''Start the service and serve until cancelled. ready (an asyncio.Event) is set once listening.'''
+    service = DesignService(workers)
+    await service.start()
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"Design service listening on http://{host}:{port} with {service.workers} warm workers")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local design evaluation service.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(port=args.port, workers=args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,159 @@
+'''
+Time-varying thrust for the descent.
+
+A ThrustProfile is a list of constant-thrust segments (duration, thrust) started at an
+ignition time or height; there is no thrust before ignition and after burnout.
+Tabulated thrust curves are turned into constant segments with the same impulse, so
+nothing is looked up per time step.
+
+PiecewiseDescent solves the descent one segment at a time: the ignition, segment and
+burnout instants are events between which the thrust is constant, so each piece is a
+closed-form DescentTrajectory (solve_ivp only where the thrust stops the payload).
+Pass a profile as the thrust of func_def.simulate_descent / descent_trajectory.
+
+Example:
+    profile = ThrustProfile.burn(40, 1.5, ignition_height=30)
+    simulate_descent(v0, h0, rho, mass, cd, area, profile, t)
+'''
+import numpy as np
+
+from trajectory import DescentTrajectory
+
+
+class ThrustProfile:
+    '''Constant-thrust segments (duration s, thrust N) from ignition (time s or height m).'''
+    __slots__ = ('segments', 'ignition_time', 'ignition_height')
+
+    def __init__(self, segments, ignition_time=None, ignition_height=None):
+        if ignition_time is not None and ignition_height is not None:
+            raise ValueError("Give either ignition_time or ignition_height, not both")
+        self.segments = tuple((float(duration), float(thrust)) for duration, thrust in segments)
+        if any(duration < 0 for duration, _ in self.segments):
+            raise ValueError("Segment durations must not be negative")
+        self.ignition_time = 0.0 if ignition_time is None and ignition_height is None else ignition_time
+        self.ignition_height = ignition_height
+
+    @classmethod
+    def constant(cls, thrust):
+        '''Thrust for the whole descent, like the scalar thrust of ODEs.descent.'''
+        return cls([(np.inf, thrust)])
+
+    @classmethod
+    def burn(cls, thrust, duration, ignition_time=None, ignition_height=None):
+        '''A single burn of constant thrust.'''
+        return cls([(duration, thrust)], ignition_time, ignition_height)
+
+    @classmethod
+    def from_curve(cls, times, thrusts, ignition_time=None, ignition_height=None):
+        '''
+        Tabulated thrust curve (times from ignition, linear between points).
+
+        Each interval becomes a constant segment of its mean thrust, which keeps the
+        total impulse and the burn time of the curve.
+        '''
+        times = np.asarray(times, dtype=float)
+        thrusts = np.asarray(thrusts, dtype=float)
+        if np.any(np.diff(times) <= 0):
+            raise ValueError("Thrust curve times must be increasing")
+        segments = list(zip(np.diff(times), 0.5 * (thrusts[:-1] + thrusts[1:])))
+        if times[0] > 0:
+            segments.insert(0, (times[0], 0.0))
+        return cls(segments, ignition_time, ignition_height)
+
+    @property
+    def burn_time(self):
+        return sum(duration for duration, _ in self.segments)
+
+    @property
+    def total_impulse(self):
+        return sum(duration * thrust for duration, thrust in self.segments if thrust)
+
+    def thrust_at(self, t):
+        '''Thrust at times t since ignition (piecewise constant).'''
+        t = np.asarray(t, dtype=float)
+        ends = np.cumsum([duration for duration, _ in self.segments])
+        index = np.searchsorted(ends, t, side='right')
+        values = np.append([thrust for _, thrust in self.segments], 0.0)
+        return np.where(t < 0, 0.0, values[index])
+
+    def __repr__(self):
+        # Content-based, so profiles work as keys of the result cache
+        return f"ThrustProfile({list(self.segments)!r}, ignition_time={self.ignition_time!r}, ignition_height={self.ignition_height!r})"
+
+
+class PiecewiseDescent:
+    '''
+    Descent under a ThrustProfile, as a sequence of constant-thrust DescentTrajectory pieces.
+
+    Event times (s from deployment, NaN if they don't happen before the impact) are
+    kept in ignition, burnout and t_impact.
+    '''
+    __slots__ = ('starts', 'pieces', 'ignition', 'burnout', 't_impact')
+
+    def __init__(self, initial_velocity, initial_height, rho, mass, drag_coefficient, area, profile):
+        self.starts = []
+        self.pieces = []
+        self.ignition = self.burnout = np.nan
+        t, v, h = 0.0, float(initial_velocity), float(initial_height)
+
+        def add(thrust, duration=np.inf):
+            piece = DescentTrajectory(v, h, rho, mass, drag_coefficient, area, thrust, t_max=min(duration, 1000.0))
+            self.starts.append(t)
+            self.pieces.append(piece)
+            return piece
+
+        # Coast until ignition
+        if profile.ignition_height is not None:
+            delay = 0.0 if h <= profile.ignition_height else None
+        else:
+            delay = profile.ignition_time
+        if delay != 0:
+            coast = add(0.0)
+            if delay is None:
+                delay = coast.time_at_height(profile.ignition_height)
+            if not delay < coast.t_impact:
+                self.t_impact = coast.t_impact
+                return # Lands before ignition
+            t, v, h = t + delay, float(coast.velocity(delay)), float(coast.height(delay))
+        self.ignition = t
+
+        for duration, thrust in profile.segments:
+            if duration == 0:
+                continue
+            piece = add(thrust, duration)
+            if piece.t_impact <= duration or not np.isfinite(duration):
+                self.t_impact = t + piece.t_impact
+                return # Lands during the burn (or the thrust lasts for the rest of the descent)
+            t, v, h = t + duration, float(piece.velocity(duration)), float(piece.height(duration))
+        self.burnout = t
+        self.t_impact = t + add(0.0).t_impact
+
+    def _evaluate(self, method, t):
+        t = np.asarray(t, dtype=float)
+        index = np.clip(np.searchsorted(self.starts, t, side='right') - 1, 0, len(self.starts) - 1)
+        value = np.zeros(t.shape)
+        for i in np.unique(index):
+            mask = index == i
+            value[mask] = getattr(self.pieces[i], method)(t[mask] - self.starts[i])
+        return value
+
+    def velocity(self, t):
+        return self._evaluate('velocity', t)
+
+    def height(self, t):
+        return self._evaluate('height', t)
+
+    def acceleration(self, t):
+        return self._evaluate('acceleration', t)
+
+    def state(self, t):
+        '''(height, velocity, acceleration) at t.'''
+        return self.height(t), self.velocity(t), self.acceleration(t)
+
+    @property
+    def impact_velocity(self):
+        return float(self.velocity(self.t_impact)) if np.isfinite(self.t_impact) else np.nan
+
+    def sample(self, t):
+        '''Arrays like simulate_descent (height, velocity, acceleration).'''
+        return self.state(t)
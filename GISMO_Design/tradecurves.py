@@ -0,0 +1,119 @@
+'''
+Vectorized drag coefficient trade curves (impact velocity, impact time, kinetic energy).
+
+The descent model in ODEs.descent (gravity, quadratic drag and constant thrust) has
+a closed-form solution, so instead of integrating one Cd at a time (like
+old/impactvelocity.py) every function here evaluates whole arrays of inputs at once.
+All inputs broadcast against each other with the usual NumPy rules, so a Cd x thrust
+or Cd x mass grid costs the same as a single curve of the same size.
+
+With the fall distance s as the independent variable, the model is
+
+    d(v^2)/ds = 2 (a - k v^2),   a = g - thrust / m,   k = rho Cd A / (2 m)
+
+which gives v^2(s) = v0^2 exp(-2ks) + (a/k) (1 - exp(-2ks)). The impact time follows
+from integrating dt = dv / (a - k v^2).
+'''
+import numpy as np
+
+g = 9.81 # Gravity
+rho = 1.225 # Air density in kg/m^3
+
+
+def impact_state(drag_coefficient, mass, area, height, initial_velocity=0.0, thrust=0.0, rho=rho):
+    '''
+    Impact velocity (m/s), time to impact (s) and kinetic energy (J) of the descent.
+
+    All arguments are SI and may be scalars or arrays (broadcast together). Velocities
+    are positive downwards, like in ODEs.descent. Where the thrust and drag stop the
+    payload before it reaches the ground the results are NaN.
+    '''
+    cd, m, A, H, v0, T = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (drag_coefficient, mass, area, height, initial_velocity, thrust)))
+    a = g - T / m
+    k = rho * cd * A / (2 * m)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        decay = np.exp(-2 * k * H)
+        # (1 - exp(-2kH)) / k, with its k -> 0 limit of 2H
+        growth = np.where(k > 0, -np.expm1(-2 * k * H) / np.where(k > 0, k, 1), 2 * H)
+        v_squared = v0 ** 2 * decay + a * growth
+        landed = v_squared > 0
+        v = np.sqrt(np.where(landed, v_squared, np.nan))
+
+        # Time to impact, one branch per sign of the net (thrust reduced) gravity
+        vt = np.sqrt(np.abs(a) / np.where(k > 0, k, 1)) # Terminal velocity when a > 0
+        t_pos = (np.log((vt + v) / (vt + v0)) + k * H) / (k * vt)
+        t_neg = (np.arctan(v0 / vt) - np.arctan(v / vt)) / (k * vt)
+        t_zero = (1 / v - 1 / v0) / k
+        t_vacuum = np.where(a != 0, (v - v0) / np.where(a != 0, a, 1), H / v0)
+        t = np.where(a > 0, t_pos, np.where(a < 0, t_neg, t_zero))
+        t = np.where(k > 0, t, t_vacuum)
+    t = np.where(landed, t, np.nan)
+    return {
+        'impact_velocity': v,
+        'impact_time': t,
+        'kinetic_energy': 0.5 * m * v ** 2,
+    }
+
+
+def trade_curve(drag_coefficients, mass, area, height, initial_velocity=0.0, thrust=0.0, rho=rho):
+    '''impact_state() for a 1-D array of drag coefficients, returned with the Cd values.'''
+    cd = np.asarray(drag_coefficients, dtype=float)
+    result = impact_state(cd, mass, area, height, initial_velocity, thrust, rho)
+    result['drag_coefficient'] = cd
+    return result
+
+
+def trade_grid(drag_coefficients, values, parameter='thrust', mass=None, area=None, height=None, initial_velocity=0.0, thrust=0.0, rho=rho):
+    '''
+    impact_state() on a 2-D grid of drag coefficient x another parameter.
+
+    parameter is the name of the second axis ('thrust', 'mass', 'height', 'area' or
+    'initial_velocity'); values are its grid values and the keyword of the same name
+    is ignored. Results have shape (len(values), len(drag_coefficients)), i.e. rows
+    follow values, ready for report.plot_grid or contour plots.
+    '''
+    inputs = {'mass': mass, 'area': area, 'height': height, 'initial_velocity': initial_velocity, 'thrust': thrust}
+    if parameter not in inputs:
+        raise ValueError(f"Unknown grid parameter: {parameter}")
+    cd = np.asarray(drag_coefficients, dtype=float)
+    values = np.asarray(values, dtype=float)
+    inputs[parameter] = values[:, np.newaxis]
+    missing = [name for name, value in inputs.items() if value is None]
+    if missing:
+        raise ValueError(f"Missing value for: {', '.join(missing)}")
+    result = impact_state(cd[np.newaxis, :], inputs['mass'], inputs['area'], inputs['height'], inputs['initial_velocity'], inputs['thrust'], rho)
+    result['drag_coefficient'] = cd
+    result[parameter] = values
+    return result
+
+
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    # Same example as old/impactvelocity.py, at 10,000 points
+    mass_kg = 4.536
+    diameter_m = 0.127
+    height_m = 130
+    initial_velocity_m_per_s = 3.9624
+    F_thrust = 5
+    area_m = np.pi * (diameter_m / 2) ** 2
+
+    curve = trade_curve(np.linspace(0.01, 1.0, 10000), mass_kg, area_m, height_m, initial_velocity_m_per_s, F_thrust)
+
+    plt.figure(figsize=(14, 6))
+    plt.subplot(1, 2, 1)
+    plt.plot(curve['drag_coefficient'], curve['impact_velocity'])
+    plt.xlabel('Drag Coefficient ($C_d$)')
+    plt.ylabel('Impact Velocity (m/s)')
+    plt.title('Impact Velocity vs. Drag Coefficient')
+    plt.grid(True)
+
+    plt.subplot(1, 2, 2)
+    plt.plot(curve['drag_coefficient'], curve['kinetic_energy'])
+    plt.xlabel('Drag Coefficient ($C_d$)')
+    plt.ylabel('Kinetic Energy Upon Impact (Joules)')
+    plt.title('Kinetic Energy vs. Drag Coefficient')
+    plt.grid(True)
+
+    plt.tight_layout()
+    plt.show()
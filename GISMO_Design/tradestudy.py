@@ -0,0 +1,84 @@
+'''
+Warm-started continuation trade studies.
+
+Steps one or two settings (e.g. mass_payload_lb, deployment_height_ft,
+drag_coefficient) along a straight path and re-optimizes the design at every point,
+starting each optimization from the previous optimum instead of the cold
+main.py guess. The step shrinks where the optimum moves quickly and grows again where
+it barely moves, and the optimum curves are returned as arrays.
+
+Example:
+    study = trade_study({'mass_payload_lb': 5}, {'mass_payload_lb': 8})
+    plt.plot(study['mass_payload_lb'], study['k'])
+'''
+import numpy as np
+
+import design
+
+OUTPUTS = ['k', 'c', 'thrust', 'impact_velocity_fts', 'max_g_force', 'total_displacement_in', 'objective', 'nfev', 'success']
+
+
+def _relative_change(new, old):
+    new = np.array([new['k'], new['c'], new['thrust']])
+    old = np.array([old['k'], old['c'], old['thrust']])
+    return np.max(np.abs(new - old) / np.maximum(np.abs(old), 1e-6))
+
+
+def trade_study(start, stop, settings=None, steps=20, max_change=0.2, min_step=None, decomposed=False):
+    '''
+    Optimize the design along the path from start to stop.
+
+    start and stop are dictionaries with the same one or two setting names, e.g.
+    {'mass_payload_lb': 5, 'drag_coefficient': 0.3}. Other settings come from settings
+    (or the main.py defaults). The path is first split into steps equal steps. A step is
+    rejected and halved (down to min_step, default a sixteenth of the first step) if
+    k, c or thrust change by more than max_change (relative) from the previous point,
+    and grown by 1.5x (up to twice the first step) if they change by less than a
+    quarter of that. With decomposed=True each point uses design.optimize_decomposed.
+
+    Returns a dictionary of arrays: the path position 's' (0 to 1), the values of the
+    stepped settings, the optimize() outputs at every accepted point and the number
+    of rejected steps.
+    '''
+    if set(start) != set(stop) or not 1 <= len(start) <= 2:
+        raise ValueError("start and stop must have the same one or two setting names")
+    base = dict(settings or {})
+    guess = base.pop('initial_guess', None) # Only for the first point
+    names = sorted(start)
+    step = 1 / steps
+    max_step = 2 * step
+    min_step = step / 16 if min_step is None else min_step
+    optimize = design.optimize_decomposed if decomposed else design.optimize
+
+    def point(s, guess):
+        values = {name: start[name] + s * (stop[name] - start[name]) for name in names}
+        overrides = {**base, **values}
+        if guess is not None:
+            overrides['initial_guess'] = guess
+        return values, optimize(design.make_settings(overrides))
+
+    values, result = point(0.0, guess)
+    points = [(0.0, values, result)]
+    s = 0.0
+    rejected = 0
+    while s < 1:
+        ds = min(step, 1 - s)
+        prev = points[-1][2]
+        values, result = point(s + ds, [prev['k'], prev['c'], prev['thrust']])
+        change = _relative_change(result, prev)
+        if change > max_change and ds > min_step:
+            rejected += 1
+            step = max(ds / 2, min_step)
+            continue
+        s = 1.0 if ds == 1 - s else s + ds
+        points.append((s, values, result))
+        if change < max_change / 4:
+            step = min(step * 1.5, max_step)
+
+    study = {'s': np.array([p[0] for p in points])}
+    for name in names:
+        study[name] = np.array([p[1][name] for p in points])
+    for key in OUTPUTS:
+        study[key] = np.array([p[2][key] for p in points])
+    study['rejected'] = rejected
+    return study
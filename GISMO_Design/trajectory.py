@@ -0,0 +1,400 @@
+'''
+Lazy trajectory objects for the SMD and descent models.
+
+Instead of sampling 1000 points up front (simulate_smd / simulate_descent), a
+trajectory keeps only what is needed to evaluate the motion at any time: the
+closed-form parameters when the model has an exact solution, or the solver's
+dense output interpolant otherwise. States, extrema and level crossings are then
+computed on demand, and arrays are only created by sample().
+
+Create them with func_def.smd_trajectory() and func_def.descent_trajectory().
+'''
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import brentq
+
+from ODEs import g
+
+
+def _bracket_roots(f, edges):
+    '''Roots of f in every interval of edges where f changes sign.'''
+    values = [f(t) for t in edges]
+    roots = []
+    for t0, t1, f0, f1 in zip(edges[:-1], edges[1:], values[:-1], values[1:]):
+        if f0 == 0:
+            roots.append(t0)
+        elif f0 * f1 < 0:
+            roots.append(brentq(f, t0, t1, xtol=1e-14, rtol=1e-12))
+    if values and values[-1] == 0:
+        roots.append(edges[-1])
+    return np.array(roots)
+
+
+class SMDTrajectory:
+    '''
+    Exact motion of ODEs.spring_mass_damper: m x'' + c x' + k x = 0.
+
+    The solution is x(t) = A exp(r1 t) + B exp(r2 t) with r1, r2 the (possibly
+    complex) roots of m r^2 + c r + k, or (A + B t) exp(r t) at critical damping.
+    Only the two roots and two coefficients are stored.
+    '''
+    __slots__ = ('r1', 'r2', 'A', 'B', 'critical')
+
+    def __init__(self, initial_displacement, initial_velocity, m_capsule, c, k):
+        x0, v0 = float(initial_displacement), float(initial_velocity)
+        disc = complex(c * c - 4 * m_capsule * k)
+        root = np.sqrt(disc)
+        self.critical = abs(root) <= 1e-9 * max(abs(c), 1e-300)
+        if self.critical:
+            r = -c / (2 * m_capsule)
+            self.r1 = self.r2 = complex(r)
+            self.A = complex(x0)
+            self.B = complex(v0 - r * x0)
+        else:
+            self.r1 = (-c + root) / (2 * m_capsule)
+            self.r2 = (-c - root) / (2 * m_capsule)
+            self.A = (v0 - self.r2 * x0) / (self.r1 - self.r2)
+            self.B = x0 - self.A
+
+    def derivative(self, t, n=0):
+        '''n-th time derivative of the displacement at t (0: x, 1: v, 2: a, 3: jerk).'''
+        t = np.asarray(t, dtype=float)
+        if self.critical:
+            r = self.r1
+            # d^n/dt^n (A + B t) e^{rt} = (A r^n + B (n r^{n-1} + r^n t)) e^{rt}
+            value = (self.A * r ** n + self.B * (n * r ** (n - 1) if n else 0) + self.B * r ** n * t) * np.exp(r * t)
+        else:
+            value = self.A * self.r1 ** n * np.exp(self.r1 * t) + self.B * self.r2 ** n * np.exp(self.r2 * t)
+        return np.real(value)
+
+    def displacement(self, t):
+        return self.derivative(t, 0)
+
+    def velocity(self, t):
+        return self.derivative(t, 1)
+
+    def acceleration(self, t):
+        return self.derivative(t, 2)
+
+    def state(self, t):
+        '''(displacement, velocity, acceleration) at t.'''
+        return self.derivative(t, 0), self.derivative(t, 1), self.derivative(t, 2)
+
+    def zeros(self, n, t_end):
+        '''Times in [0, t_end] where the n-th derivative is zero.'''
+        if self.critical:
+            r = self.r1
+            # (p + q t) e^{rt} with the terms from derivative()
+            p = np.real(self.A * r ** n + self.B * (n * r ** (n - 1) if n else 0))
+            q = np.real(self.B * r ** n)
+            roots = [-p / q] if q != 0 else []
+        elif self.r1.imag != 0:
+            # Underdamped: e^{st} R cos(wt + phi) vanishes every pi / w
+            coeff = self.A * self.r1 ** n
+            w = abs(self.r1.imag)
+            phase = np.angle(coeff) if self.r1.imag > 0 else -np.angle(coeff)
+            first = (np.pi / 2 - phase) / w
+            first -= np.floor(first * w / np.pi) * np.pi / w
+            roots = first + np.arange(0, int(max(t_end - first, 0) * w / np.pi) + 1) * np.pi / w
+        else:
+            # Overdamped: A r1^n e^{r1 t} = -B r2^n e^{r2 t} has at most one root
+            p = np.real(self.A * self.r1 ** n)
+            q = np.real(self.B * self.r2 ** n)
+            ratio = -q / p if p != 0 else 0
+            roots = [np.log(ratio) / np.real(self.r1 - self.r2)] if ratio > 0 else []
+        roots = np.asarray(roots, dtype=float)
+        return roots[(roots >= 0) & (roots <= t_end)]
+
+    def _peak(self, n, t_end, absolute):
+        times = np.concatenate([[0.0, t_end], self.zeros(n + 1, t_end)])
+        values = self.derivative(times, n)
+        i = np.argmax(np.abs(values)) if absolute else np.argmax(values)
+        return float(times[i]), float(values[i])
+
+    def max_displacement(self, t_end):
+        '''(time, value) of the largest displacement in [0, t_end].'''
+        return self._peak(0, t_end, absolute=False)
+
+    def min_displacement(self, t_end):
+        times = np.concatenate([[0.0, t_end], self.zeros(1, t_end)])
+        values = self.displacement(times)
+        i = np.argmin(values)
+        return float(times[i]), float(values[i])
+
+    def peak_acceleration(self, t_end):
+        '''(time, value) of the largest acceleration magnitude in [0, t_end].'''
+        return self._peak(2, t_end, absolute=True)
+
+    def stroke(self, t_end):
+        '''Total travel max(x) - min(x) over [0, t_end].'''
+        return self.max_displacement(t_end)[1] - self.min_displacement(t_end)[1]
+
+    def crossings(self, level, t_end):
+        '''Times in [0, t_end] where the displacement equals level.'''
+        # x is monotonic between velocity zeros, so each piece has at most one crossing
+        edges = np.unique(np.concatenate([[0.0, t_end], self.zeros(1, t_end)]))
+        return _bracket_roots(lambda t: float(self.displacement(t)) - level, edges)
+
+    def sample(self, t):
+        '''Arrays like simulate_smd (displacement, velocity, acceleration), with exact acceleration.'''
+        return self.state(t)
+
+
+class DescentTrajectory:
+    '''
+    Motion of ODEs.descent (velocity positive downwards, height above the ground).
+
+    When the thrust is below the weight and there is drag, the exact solution is
+    stored as a handful of floats: v(t) = vt tanh(k vt t + phi0) (or coth when
+    starting faster than the terminal velocity vt). When the thrust is above the
+    weight and the payload reaches the ground (or t_max) before stopping, it is
+    v(t) = vt tan(phi0 - k vt t), held at its stopping point after that. Any other
+    case falls back to a solve_ivp dense output interpolant up to the impact (or
+    t_max).
+    '''
+    __slots__ = ('h0', 'v0', 'a', 'k', 'vt', 'phi0', 'mode', 'solution', 't_impact')
+
+    def __init__(self, initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust, t_max=1000.0):
+        self.h0 = float(initial_height)
+        self.v0 = float(initial_velocity)
+        self.a = g - thrust / mass
+        self.k = 0.5 * rho * drag_coefficient * area / mass
+        self.solution = None
+        if self.a > 0 and self.k > 0 and self.v0 >= 0:
+            self.vt = np.sqrt(self.a / self.k)
+            if np.isclose(self.v0, self.vt, rtol=1e-12):
+                self.mode = 'terminal'
+                self.phi0 = 0.0
+            elif self.v0 < self.vt:
+                self.mode = 'tanh'
+                self.phi0 = np.arctanh(self.v0 / self.vt)
+            else:
+                self.mode = 'coth'
+                self.phi0 = np.arctanh(self.vt / self.v0)
+            self.t_impact = self.time_at_height(0.0)
+        elif self.a < 0 and self.k > 0 and self.v0 > 0 and (self.v0 ** 2 * np.exp(-2 * self.k * self.h0) + self.a * -np.expm1(-2 * self.k * self.h0) / self.k > 0
+                                                          or np.arctan(self.v0 * np.sqrt(-self.k / self.a)) / np.sqrt(-self.a * self.k) >= t_max):
+            # Slowing down, and landing (or reaching t_max) before stopping
+            self.mode = 'tan'
+            self.vt = np.sqrt(-self.a / self.k)
+            self.phi0 = np.arctan(self.v0 / self.vt)
+            self.t_impact = self.time_at_height(0.0)
+        else:
+            self.mode = 'dense'
+            self.vt = self.phi0 = np.nan
+            a, k = self.a, self.k
+
+            def ground(t, y):
+                return y[1]
+            ground.terminal = True
+            result = solve_ivp(lambda t, y: [a - k * abs(y[0]) * y[0], -y[0]], (0, t_max), [self.v0, self.h0], events=ground, dense_output=True, rtol=1e-10, atol=1e-10)
+            self.solution = result.sol
+            self.t_impact = float(result.t_events[0][0]) if len(result.t_events[0]) else np.nan
+
+    def _fallen(self, t):
+        # Distance fallen since t = 0 for the closed-form modes
+        u = self.k * self.vt * t + self.phi0
+        if self.mode == 'terminal':
+            return self.vt * t
+        if self.mode == 'tanh':
+            return (np.logaddexp(u, -u) - np.logaddexp(self.phi0, -self.phi0)) / self.k
+        if self.mode == 'tan':
+            u = np.clip(self.phi0 - self.k * self.vt * t, 0, None)
+            return np.log(np.cos(u) / np.cos(self.phi0)) / self.k
+        return (np.log(-np.expm1(-2 * u)) + u - np.log(-np.expm1(-2 * self.phi0)) - self.phi0) / self.k
+
+    def velocity(self, t):
+        t = np.asarray(t, dtype=float)
+        if self.mode == 'dense':
+            return self.solution(t)[0]
+        u = self.k * self.vt * t + self.phi0
+        if self.mode == 'terminal':
+            return np.full_like(t, self.vt)
+        if self.mode == 'tan':
+            return self.vt * np.tan(np.clip(self.phi0 - self.k * self.vt * t, 0, None))
+        return self.vt * (np.tanh(u) if self.mode == 'tanh' else 1 / np.tanh(u))
+
+    def height(self, t):
+        t = np.asarray(t, dtype=float)
+        if self.mode == 'dense':
+            return self.solution(t)[1]
+        return self.h0 - self._fallen(t)
+
+    def acceleration(self, t):
+        v = self.velocity(t)
+        return self.a - self.k * np.abs(v) * v
+
+    def state(self, t):
+        '''(height, velocity, acceleration) at t.'''
+        return self.height(t), self.velocity(t), self.acceleration(t)
+
+    def time_at_height(self, height):
+        '''First time the payload passes the given height (NaN if it never does).'''
+        if self.mode == 'dense':
+            if height == 0:
+                return self.t_impact
+            end = self.t_impact if np.isfinite(self.t_impact) else self.solution.t_max
+            edges = np.linspace(0, end, 200)
+            roots = _bracket_roots(lambda t: float(self.height(t)) - height, edges)
+            return float(roots[0]) if len(roots) else np.nan
+        s = self.h0 - height
+        if s < 0:
+            return np.nan
+        if self.mode == 'terminal':
+            return s / self.vt
+        if self.mode == 'tan':
+            ratio = np.cos(self.phi0) * np.exp(self.k * s)
+            return float((self.phi0 - np.arccos(ratio)) / (self.k * self.vt)) if ratio <= 1 else np.nan
+        if self.mode == 'tanh':
+            u = np.arccosh(np.cosh(self.phi0) * np.exp(self.k * s))
+        else:
+            u = np.arcsinh(np.sinh(self.phi0) * np.exp(self.k * s))
+        return float((u - self.phi0) / (self.k * self.vt))
+
+    @property
+    def impact_velocity(self):
+        return float(self.velocity(self.t_impact)) if np.isfinite(self.t_impact) else np.nan
+
+    def max_velocity(self, t_end=None):
+        '''(time, value) of the largest downward velocity up to t_end (default: impact).'''
+        t_end = self.t_impact if t_end is None else t_end
+        if self.mode == 'dense':
+            edges = np.linspace(0, t_end, 200)
+            times = np.concatenate([edges, _bracket_roots(lambda t: float(self.acceleration(t)), edges)])
+        else:
+            times = np.array([0.0, t_end]) # Monotonic (towards the terminal velocity, or slowing down)
+        values = self.velocity(times)
+        i = np.argmax(values)
+        return float(times[i]), float(values[i])
+
+    def sample(self, t):
+        '''Arrays like simulate_descent (height, velocity, acceleration).'''
+        return self.state(t)
+
+
+class StoppedSMDTrajectory:
+    '''
+    SMD motion with an end-of-travel stop at +/- limit.
+
+    Between contacts the motion is an SMDTrajectory. Contact starts where the
+    displacement crosses the limit moving outwards (found by root finding, see
+    SMDTrajectory.crossings) and then either:
+     - rigid stop (bumper_k None): the velocity is reversed and scaled by the
+       coefficient of restitution, an impulse with unbounded g, or
+     - bumper: a spring bumper_k and damper bumper_c act beyond the limit. The motion
+       is still linear, so it is an SMDTrajectory about the shifted equilibrium
+       bumper_k * limit / (k + bumper_k) until the limit is crossed on the way back.
+    The motion is built up to t_end. Each contact is recorded in contacts as a dict
+    with time, velocity (at the limit, moving outwards), duration and peak_g.
+    '''
+    __slots__ = ('limit', 'starts', 'segments', 'contacts')
+
+    def __init__(self, initial_displacement, initial_velocity, m_capsule, c, k, limit, t_end, bumper_k=None, bumper_c=0.0, restitution=0.0, max_contacts=1000):
+        self.limit = float(limit)
+        self.starts = [] # Start time of every segment
+        self.segments = [] # (SMDTrajectory, offset of its displacement)
+        self.contacts = []
+        t, x, v = 0.0, float(initial_displacement), float(initial_velocity)
+        while t < t_end and len(self.contacts) < max_contacts:
+            free = SMDTrajectory(x, v, m_capsule, c, k)
+            self.starts.append(t)
+            self.segments.append((free, 0.0))
+            hit = self._first_crossing(free, 0.0, t_end - t, outwards=True)
+            if hit is None:
+                break
+            t_hit, side = hit
+            t += t_hit
+            v_hit = float(free.velocity(t_hit))
+            x = side * self.limit
+            if bumper_k is None:
+                self.contacts.append({'time': t, 'velocity': abs(v_hit), 'duration': 0.0, 'peak_g': np.inf if v_hit != 0 else 0.0})
+                v = -restitution * v_hit
+                continue
+            offset = bumper_k * x / (k + bumper_k)
+            contact = SMDTrajectory(x - offset, v_hit, m_capsule, c + bumper_c, k + bumper_k)
+            self.starts.append(t)
+            self.segments.append((contact, offset))
+            leave = self._first_crossing(contact, offset, t_end - t, outwards=False)
+            duration = leave[0] if leave is not None else t_end - t
+            peak = abs(contact.peak_acceleration(duration)[1]) / g
+            self.contacts.append({'time': t, 'velocity': abs(v_hit), 'duration': duration, 'peak_g': peak})
+            if leave is None:
+                break
+            t += duration
+            v = float(contact.velocity(duration))
+
+    def _first_crossing(self, trajectory, offset, span, outwards):
+        '''(time, side) where trajectory + offset first crosses +/- limit in (0, span].'''
+        # Displacement is monotonic between velocity zeros, so only the first piece
+        # that brackets a crossing needs a root solve
+        edges = np.unique(np.concatenate([[0.0, span], trajectory.zeros(1, span)]))
+        x = trajectory.displacement(edges) + offset
+        best = None # (index of the bracketing piece, side)
+        for side in (1, -1):
+            # side * x - limit goes from below zero to >= 0 when moving outwards
+            depth = side * x - self.limit
+            if outwards:
+                hits = np.flatnonzero((depth[:-1] < 0) & (depth[1:] >= 0))
+            else:
+                hits = np.flatnonzero((depth[:-1] > 0) & (depth[1:] <= 0))
+            if len(hits) and (best is None or hits[0] < best[0]):
+                best = (hits[0], side)
+        if best is None:
+            return None
+        i, side = best
+        root = brentq(lambda t: side * (float(trajectory.displacement(t)) + offset) - self.limit, edges[i], edges[i + 1], xtol=1e-14, rtol=1e-12)
+        return root, side
+
+    def derivative(self, t, n=0):
+        '''n-th time derivative of the displacement at t (contact impulses excluded).'''
+        t = np.asarray(t, dtype=float)
+        index = np.clip(np.searchsorted(self.starts, t, side='right') - 1, 0, len(self.starts) - 1)
+        value = np.zeros(t.shape)
+        for i in np.unique(index):
+            mask = index == i
+            trajectory, offset = self.segments[i]
+            value[mask] = trajectory.derivative(t[mask] - self.starts[i], n) + (offset if n == 0 else 0.0)
+        return value
+
+    def displacement(self, t):
+        return self.derivative(t, 0)
+
+    def velocity(self, t):
+        return self.derivative(t, 1)
+
+    def acceleration(self, t):
+        return self.derivative(t, 2)
+
+    def state(self, t):
+        '''(displacement, velocity, acceleration) at t.'''
+        return self.derivative(t, 0), self.derivative(t, 1), self.derivative(t, 2)
+
+    def _segment_spans(self, t_end):
+        ends = self.starts[1:] + [np.inf]
+        for start, end, (trajectory, offset) in zip(self.starts, ends, self.segments):
+            if start < t_end:
+                yield trajectory, offset, min(end, t_end) - start
+
+    def peak_acceleration(self, t_end):
+        '''Largest acceleration magnitude (m/s^2) in [0, t_end], rigid stop impulses excluded.'''
+        return max(abs(trajectory.peak_acceleration(span)[1]) for trajectory, _, span in self._segment_spans(t_end))
+
+    def stroke(self, t_end):
+        '''Total travel max(x) - min(x) over [0, t_end].'''
+        highs, lows = [], []
+        for trajectory, offset, span in self._segment_spans(t_end):
+            highs.append(trajectory.max_displacement(span)[1] + offset)
+            lows.append(trajectory.min_displacement(span)[1] + offset)
+        return max(highs) - min(lows)
+
+    def contact_summary(self):
+        '''Contact count, contact velocities (m/s) and the largest contact g.'''
+        return {
+            'contact_count': len(self.contacts),
+            'contact_velocities': [contact['velocity'] for contact in self.contacts],
+            'peak_contact_g': max((contact['peak_g'] for contact in self.contacts), default=0.0),
+        }
+
+    def sample(self, t):
+        '''Arrays like simulate_smd (displacement, velocity, acceleration), with exact acceleration.'''
+        return self.state(t)
@@ -0,0 +1,218 @@
+'''
+Wind drift of the descent and landing dispersion.
+
+ODEs.descent is vertical only. ODEs.drift_descent adds horizontal motion (east and
+north) and a wind profile, with the drag acting on the airspeed, and uses the same
+drag, thrust and mass parameters as simulate_descent. simulate_drift() integrates a
+whole batch of samples at once with fixed-step RK4, each step being one vectorized
+evaluation for all samples; a sample stops where it reaches the ground, found by
+interpolating within the step. dispersion_ellipse() then gives the landing footprint.
+
+Example:
+    samples = sample_deployments(n_samples=5000, wind_speed_ms=5, wind_sigma_ms=2)
+    result = simulate_samples(samples)
+    dispersion_ellipse(result['landing'], 0.95)
+'''
+import argparse
+
+import numpy as np
+
+import design
+from ODEs import drift_descent
+
+
+def power_law_wind(speed, direction_deg, reference_height=10.0, exponent=1 / 7):
+    '''
+    Wind profile speed * (h / reference_height)^exponent blowing towards direction_deg.
+
+    Directions are measured clockwise from north (90 = blowing towards the east).
+    speed and direction_deg may be arrays of one value per sample. Returns wind(h)
+    -> (east, north).
+    '''
+    speed = np.asarray(speed, dtype=float)
+    direction = np.radians(direction_deg)
+    east, north = speed * np.sin(direction), speed * np.cos(direction)
+
+    def wind(h):
+        profile = (np.clip(h, 0, None) / reference_height) ** exponent
+        return east * profile, north * profile
+    return wind
+
+
+def tabulated_wind(heights, east, north):
+    '''
+    Wind interpolated linearly in height from a table (constant beyond its ends).
+
+    heights is increasing; east and north have one value per height, or one row per
+    sample (n_samples, n_heights). Returns wind(h) -> (east, north).
+    '''
+    heights = np.asarray(heights, dtype=float)
+    east = np.asarray(east, dtype=float)
+    north = np.asarray(north, dtype=float)
+
+    def wind(h):
+        h = np.clip(h, heights[0], heights[-1])
+        i = np.clip(np.searchsorted(heights, h) - 1, 0, len(heights) - 2)
+        f = (h - heights[i]) / (heights[i + 1] - heights[i])
+        if east.ndim == 1:
+            return east[i] + f * (east[i + 1] - east[i]), north[i] + f * (north[i + 1] - north[i])
+        rows = np.arange(len(h)) if np.ndim(h) else 0
+        return (east[rows, i] + f * (east[rows, i + 1] - east[rows, i]),
+                north[rows, i] + f * (north[rows, i + 1] - north[rows, i]))
+    return wind
+
+
+def simulate_drift(initial_velocity, initial_height, rho, mass, drag_coefficient, area, thrust, wind, horizontal_velocity=(0.0, 0.0), dt=0.02, t_max=1000.0):
+    '''
+    Integrate the drifting descent of a batch of samples until all have landed.
+
+    The first seven arguments are those of simulate_descent and may be scalars or
+    arrays of one value per sample; horizontal_velocity is the initial (east, north)
+    velocity, and wind a profile such as power_law_wind(). Returns a dictionary of
+    per-sample arrays: 'landing' (n, 2) east/north position (m), 'impact_velocity'
+    (n, 3) ground-relative east/north/down components, 'impact_speed', 'impact_time'
+    and 'landed' (False where the payload is still airborne at t_max).
+    '''
+    v0, h0, m, cd, A, T, u0, w0 = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float)) for x in (initial_velocity, initial_height, mass, drag_coefficient, area, thrust, horizontal_velocity[0], horizontal_velocity[1])))
+    n = len(v0)
+    state = np.array([np.zeros(n), np.zeros(n), h0, u0, w0, v0])
+    final = state.copy()
+    impact_time = np.full(n, np.nan)
+    active = np.ones(n, dtype=bool)
+
+    def rhs(y):
+        return np.array(drift_descent(y, 0, rho, m, cd, A, T, wind))
+
+    t = 0.0
+    while active.any() and t < t_max:
+        k1 = rhs(state)
+        k2 = rhs(state + 0.5 * dt * k1)
+        k3 = rhs(state + 0.5 * dt * k2)
+        k4 = rhs(state + dt * k3)
+        new = state + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        landing = active & (new[2] <= 0)
+        if landing.any():
+            # Linear interpolation of the state to h = 0 within the step
+            f = state[2, landing] / (state[2, landing] - new[2, landing])
+            final[:, landing] = state[:, landing] + f * (new[:, landing] - state[:, landing])
+            impact_time[landing] = t + f * dt
+            active &= ~landing
+        state = new
+        t += dt
+
+    final[:, active] = state[:, active]
+    return {
+        'landing': final[:2].T,
+        'impact_velocity': final[3:].T,
+        'impact_speed': np.sqrt(np.sum(final[3:] ** 2, axis=0)),
+        'impact_time': impact_time,
+        'landed': ~active,
+    }
+
+
+def sample_deployments(settings=None, n_samples=1000, seed=0, thrust=0.0, wind_speed_ms=5.0, wind_sigma_ms=2.0, wind_direction_deg=90.0, direction_sigma_deg=20.0,
+                       height_sigma=0.05, velocity_sigma=0.10, horizontal_sigma_ms=1.0):
+    '''
+    Draw wind and deployment samples around the nominal settings.
+
+    Wind speed and direction are normal around the given values (speed kept >= 0).
+    Deployment height and vertical velocity get relative normal scatter, the
+    horizontal deployment velocity an absolute one in both directions. Returns a
+    dictionary of SI arrays for simulate_samples().
+    '''
+    si = design.to_si(settings)
+    rng = np.random.default_rng(seed)
+    return {
+        'initial_velocity': si['initial_deployment_velocity_ms'] * np.clip(1 + velocity_sigma * rng.standard_normal(n_samples), 0, None),
+        'initial_height': si['deployment_height_m'] * np.clip(1 + height_sigma * rng.standard_normal(n_samples), 0.01, None),
+        'horizontal_velocity': horizontal_sigma_ms * rng.standard_normal((2, n_samples)),
+        'wind_speed': np.clip(wind_speed_ms + wind_sigma_ms * rng.standard_normal(n_samples), 0, None),
+        'wind_direction_deg': wind_direction_deg + direction_sigma_deg * rng.standard_normal(n_samples),
+        'mass': si['mass_payload_kg'],
+        'drag_coefficient': si['drag_coefficient'],
+        'area': si['area_m'],
+        'thrust': thrust,
+    }
+
+
+def simulate_samples(samples, dt=0.02, **wind_options):
+    '''simulate_drift() for the output of sample_deployments() with a power-law wind profile.'''
+    wind = power_law_wind(samples['wind_speed'], samples['wind_direction_deg'], **wind_options)
+    return simulate_drift(samples['initial_velocity'], samples['initial_height'], design.rho, samples['mass'], samples['drag_coefficient'], samples['area'],
+                          samples['thrust'], wind, samples['horizontal_velocity'], dt=dt)
+
+
+def dispersion_ellipse(points, probability=0.95):
+    '''
+    Ellipse expected to contain the given fraction of the (n, 2) landing points.
+
+    Assumes a 2-D normal spread: the semi-axes are the standard deviations along the
+    principal directions times sqrt(-2 ln(1 - probability)). Returns a dictionary with
+    'center', 'semi_axes' (major, minor; m) and 'angle_deg' of the major axis
+    (clockwise from north) and the fraction of the points actually inside.
+    '''
+    points = np.asarray(points, dtype=float)
+    points = points[np.all(np.isfinite(points), axis=1)]
+    center = points.mean(axis=0)
+    variances, axes = np.linalg.eigh(np.cov(points.T))
+    order = np.argsort(variances)[::-1]
+    variances, axes = np.clip(variances[order], 0, None), axes[:, order]
+    scale = np.sqrt(-2 * np.log(1 - probability))
+    semi_axes = scale * np.sqrt(variances)
+    # Normalized distance of every point in the principal frame
+    local = (points - center) @ axes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inside = np.sum((local / semi_axes) ** 2, axis=1) <= 1
+    return {
+        'center': center,
+        'semi_axes': semi_axes,
+        'angle_deg': float(np.degrees(np.arctan2(axes[0, 0], axes[1, 0])) % 180),
+        'covered': float(inside.mean()),
+    }
+
+
+def plot_footprint(result, path, probabilities=(0.5, 0.95, 0.99)):
+    '''Landing points and dispersion ellipses, saved headless.'''
+    import report
+    from matplotlib.patches import Ellipse
+
+    points = result['landing'][result['landed']]
+    fig, ax = report.subplots(figsize=(8, 8))
+    report.plot_cloud(ax, points[:, 0], points[:, 1], s=2, alpha=0.3, label='Landing points')
+    for probability in probabilities:
+        e = dispersion_ellipse(points, probability)
+        ax.add_patch(Ellipse(e['center'], 2 * e['semi_axes'][0], 2 * e['semi_axes'][1], angle=90 - e['angle_deg'], fill=False, lw=2, label=f'{probability:.0%} ellipse'))
+    ax.plot(0, 0, 'k+', ms=12, label='Deployment point')
+    ax.set_xlabel('East (m)')
+    ax.set_ylabel('North (m)')
+    ax.set_title('Landing Footprint')
+    ax.set_aspect('equal', adjustable='datalim')
+    ax.legend()
+    fig.tight_layout()
+    return report.save_figure(fig, path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Landing dispersion of the descent under wind.")
+    parser.add_argument('-n', '--samples', type=int, default=5000)
+    parser.add_argument('--wind', type=float, default=5.0, help="Mean wind speed at 10 m (m/s)")
+    parser.add_argument('--wind-sigma', type=float, default=2.0, help="Wind speed scatter (m/s)")
+    parser.add_argument('--direction', type=float, default=90.0, help="Direction the wind blows towards (deg from north)")
+    parser.add_argument('--thrust', type=float, default=0.0, help="Constant thrust (N)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Save the footprint figure to this file")
+    args = parser.parse_args()
+
+    samples = sample_deployments(n_samples=args.samples, seed=args.seed, thrust=args.thrust, wind_speed_ms=args.wind, wind_sigma_ms=args.wind_sigma, wind_direction_deg=args.direction)
+    result = simulate_samples(samples)
+    landed = result['landed']
+    print(f"{landed.sum()} of {len(landed)} samples landed")
+    down = result['impact_velocity'][landed, 2]
+    horizontal = np.hypot(result['impact_velocity'][landed, 0], result['impact_velocity'][landed, 1])
+    print(f"Impact velocity: vertical {down.mean():.2f} +/- {down.std():.2f} m/s, horizontal {horizontal.mean():.2f} +/- {horizontal.std():.2f} m/s")
+    for probability in (0.5, 0.95, 0.99):
+        e = dispersion_ellipse(result['landing'][landed], probability)
+        print(f"{probability:.0%} ellipse: center ({e['center'][0]:.1f}, {e['center'][1]:.1f}) m, semi-axes {e['semi_axes'][0]:.1f} x {e['semi_axes'][1]:.1f} m, "
+              f"major axis at {e['angle_deg']:.0f} deg, contains {e['covered']:.1%} of the points")
+    if args.output:
+        plot_footprint(result, args.output)